@@ -27,12 +27,18 @@ interface DataTableProps<TData, TValue> {
   columns: ColumnDef<TData, TValue>[];
   data: TData[];
   onDrop?: (file: TData, folder: TData) => void;
+  hasMore?: boolean;
+  isLoadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
 export function FileTable<TData, TValue>({
   columns,
   data,
   onDrop,
+  hasMore,
+  isLoadingMore,
+  onLoadMore,
 }: DataTableProps<TData, TValue>) {
   const [filterValue, setFilterValue] = useState("");
   const table = useReactTable({
@@ -41,6 +47,8 @@ export function FileTable<TData, TValue>({
     getCoreRowModel: getCoreRowModel(),
     getPaginationRowModel: getPaginationRowModel(),
     getFilteredRowModel: getFilteredRowModel(),
+    // Keep the current page when the next batch of entries is appended.
+    autoResetPageIndex: false,
     state: {
       globalFilter: filterValue,
     },
@@ -151,8 +159,10 @@ export function FileTable<TData, TValue>({
           <Button
             variant="outline"
             size="sm"
-            onClick={() => table.nextPage()}
-            disabled={!table.getCanNextPage()}
+            onClick={() =>
+              table.getCanNextPage() ? table.nextPage() : onLoadMore && onLoadMore()
+            }
+            disabled={!table.getCanNextPage() && (!hasMore || isLoadingMore)}
           >
             Next
           </Button>
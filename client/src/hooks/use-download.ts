@@ -35,7 +35,7 @@ export function useDownload() {
     }));
   
     try {
-      const headRes = await axiosInstance.get(
+      const headRes = await axiosInstance.head(
         `/files/download`,
         {
           params: { file_name: fileName, path: params },
@@ -44,6 +44,7 @@ export function useDownload() {
   
   
       const fileSize = parseInt(headRes.headers["content-length"], 10);
+      const etag: string | undefined = headRes.headers["etag"];
       if (isNaN(fileSize) || fileSize <= 0) {
         throw new Error("Invalid content-length header");
       }
@@ -64,7 +65,11 @@ export function useDownload() {
           "/files/download",
           {
             params: { file_name: fileName, path: params },
-            headers: { Range: `bytes=${start}-${end}` },
+            // If-Range makes the server answer 200 with the whole file instead of
+            // stitching together ranges of two different versions.
+            headers: etag
+              ? { Range: `bytes=${start}-${end}`, "If-Range": etag }
+              : { Range: `bytes=${start}-${end}` },
             responseType: "blob",
             withCredentials: true,
             onDownloadProgress: (e) => {
@@ -85,6 +90,9 @@ export function useDownload() {
             },
           }
         );
+        if (response.status !== 206) {
+          throw new Error(`${fileName} changed on the server during download`);
+        }
         chunks.push(response.data);
       }
   
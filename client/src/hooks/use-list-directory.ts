@@ -1,8 +1,11 @@
 import axiosInstance from "@/lib/axios";
-import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
+import { useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { useLocation, useNavigate } from "react-router-dom";
 import { toast } from "sonner";
 
+// Entries fetched per list-directory request; more pages load as the table reaches the end.
+const LIST_PAGE_SIZE = 500;
+
 export default function useListDirectory() {
   const location = useLocation();
   const searchParams = new URLSearchParams(location.search);
@@ -20,19 +23,30 @@ export default function useListDirectory() {
     navigate(`${location.pathname}?path=${newPath}`);
   };
 
-  const { data: DirectoryList, isLoading: isLoadingDirectory } = useQuery({
+  const {
+    data,
+    isLoading: isLoadingDirectory,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ["list-directory", path],
-    queryFn: async () => {
+    queryFn: async ({ pageParam }) => {
       const response = await axiosInstance.get("/files/list-directory", {
         params: {
           path: path ? path : "",
+          limit: LIST_PAGE_SIZE,
+          cursor: pageParam || undefined,
         },
       });
-      return response.data.message;
+      return response.data;
     },
+    initialPageParam: "",
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     staleTime: 5 * 60 * 1000,
     gcTime: 5 * 60 * 1000,
   });
+  const DirectoryList = data?.pages.flatMap((page) => page.message);
 
   const { mutate: moveFileTo, isPending: isMoving } = useMutation({
     mutationFn: async ({ from, to }: { from: string; to: string }) => {
@@ -120,6 +134,10 @@ export default function useListDirectory() {
   return {
     DirectoryList,
     isLoadingDirectory,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+    path,
     handleFolderClick,
     deleteFile,
     deletePending,
@@ -16,6 +16,19 @@ export interface UploadProgress {
   };
 }
 
+interface UploadSession {
+  session_id: string;
+  total_chunks: number;
+  missing_chunks: number[];
+}
+
+async function sha256Hex(blob: Blob): Promise<string> {
+  const digest = await crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
 export function useUpload() {
   const location = useLocation();
   const searchParams = new URLSearchParams(location.search);
@@ -46,21 +59,46 @@ export function useUpload() {
       const totalSize = file.size;
       let uploadedSize = 0;
 
-      const uploadChunk = async (chunk: Blob, index: number, retries = 3) => {
-        const formData = new FormData();
-        formData.append("chunk_data", chunk, file.name);
-        
+      // Reuse the server-side session for this exact file so an interrupted
+      // upload only re-sends the chunks the server is missing.
+      const sessionKey = `upload-session:${params}:${file.name}:${file.size}:${file.lastModified}`;
+      const getSession = async (): Promise<UploadSession> => {
+        const savedId = localStorage.getItem(sessionKey);
+        if (savedId) {
+          try {
+            const res = await axiosInstance.get(`/files/upload-sessions/${savedId}`, {
+              withCredentials: true,
+            });
+            return res.data;
+          } catch {
+            localStorage.removeItem(sessionKey);
+          }
+        }
+        const res = await axiosInstance.post(
+          "/files/upload-sessions",
+          {
+            file_name: file.name,
+            path: params,
+            total_size: file.size,
+            chunk_size: CHUNK_SIZE,
+          },
+          { withCredentials: true }
+        );
+        localStorage.setItem(sessionKey, res.data.session_id);
+        return res.data;
+      };
+
+      const uploadChunk = async (sessionId: string, chunk: Blob, index: number, retries = 3) => {
         try {
-          const response = await axiosInstance.post(
-            "/files/upload-chunk",
-            formData,
+          const checksum = await sha256Hex(chunk);
+          const response = await axiosInstance.put(
+            `/files/upload-sessions/${sessionId}/chunks/${index}`,
+            chunk,
             {
               withCredentials: true,
-              params: {
-                file_id: file.name,
-                chunk_number: index,
-                total_chunks: chunks.length,
-                path: params,
+              headers: {
+                "Content-Type": "application/octet-stream",
+                "X-Chunk-Checksum": checksum,
               },
               onUploadProgress: (progressEvent) => {
                 const chunkUploadedSize = progressEvent.loaded;
@@ -83,7 +121,7 @@ export function useUpload() {
         } catch (error: any) {
           if (retries > 0) {
             console.warn(`Retrying chunk ${index} of file ${file.name}. Attempts left: ${retries}`);
-            await uploadChunk(chunk, index, retries - 1);
+            await uploadChunk(sessionId, chunk, index, retries - 1);
           } else {
             throw new Error(`Failed to upload chunk ${index} of file ${file.name} after multiple attempts: ${error.message}`);
           }
@@ -91,8 +129,18 @@ export function useUpload() {
       };
 
       try {
-        const chunkPromises = chunks.map((chunk, index) => uploadChunk(chunk, index));
+        const session = await getSession();
+        uploadedSize = (session.total_chunks - session.missing_chunks.length) * CHUNK_SIZE;
+        const chunkPromises = session.missing_chunks.map((index) =>
+          uploadChunk(session.session_id, chunks[index] ?? new Blob([]), index)
+        );
         await Promise.all(chunkPromises);
+        await axiosInstance.post(
+          `/files/upload-sessions/${session.session_id}/commit`,
+          null,
+          { withCredentials: true }
+        );
+        localStorage.removeItem(sessionKey);
         setLoading((prev) => ({
           ...prev,
           [i]: { percentage: 100, loading: false,file_name:file.name,paused:false },
@@ -21,10 +21,18 @@ import TransferStatus from "@/components/transfer-status";
 import { FolderIcon } from "@/utils/data";
 
 interface Files {
-  is_folder: string;
+  is_folder: boolean;
   size: string;
   time: string;
   name: string;
+  permissions?: {
+    read: boolean;
+    write: boolean;
+    execute: boolean;
+    delete: boolean;
+    modify: boolean;
+    full_control: boolean;
+  };
 }
 
 export const columns: ColumnDef<Files>[] = [
@@ -103,7 +111,10 @@ export const columns: ColumnDef<Files>[] = [
           </DropdownMenuTrigger>
           <DropdownMenuContent align="end">
             <DropdownMenuLabel>Actions</DropdownMenuLabel>
-            <DropdownMenuItem onClick={() => deleteFile({ name: file.name })}>
+            <DropdownMenuItem
+              disabled={file.permissions && !file.permissions.delete}
+              onClick={() => deleteFile({ name: file.name })}
+            >
               Delete
             </DropdownMenuItem>
             <DropdownMenuSeparator />
@@ -124,7 +135,15 @@ export const columns: ColumnDef<Files>[] = [
   },
 ];
 export default function Home() {
-  const { DirectoryList, isLoadingDirectory, moveFileTo } = useListDirectory();
+  const {
+    DirectoryList,
+    isLoadingDirectory,
+    moveFileTo,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+    path,
+  } = useListDirectory();
 
   const handleDrop = (file: Files, folder: Files) => {
     if (folder.is_folder) {
@@ -147,9 +166,13 @@ export default function Home() {
       <Nav />
       <div className="flex flex-col m-5  ">
           <FileTable
+            key={path}
             columns={columns}
             data={DirectoryList}
             onDrop={handleDrop}
+            hasMore={hasNextPage}
+            isLoadingMore={isFetchingNextPage}
+            onLoadMore={() => fetchNextPage()}
           />
       </div>
     </main>
@@ -0,0 +1,127 @@
+"""
+Requests per second through the files API with a fresh rollback-journal connection per
+get_db_connection() call (the old behaviour) versus pooled WAL connections.
+
+    python benchmarks/bench_db.py --requests 2000 --concurrency 32
+
+The mix is list-directory, get-file and get-file-groups reads plus create-directory
+writes. The permission and file details caches are disabled so every request reaches
+SQLite.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+SHARE = tempfile.mkdtemp()
+# Route defaults are bound at import time.
+Config.SHARED_FOLDER = SHARE
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+import utils.utils as db_utils  # noqa: E402
+from utils.cache import details_cache, permission_cache  # noqa: E402
+from utils.jwt import get_current_user  # noqa: E402
+from utils.permissions import register_files  # noqa: E402
+from routes import files  # noqa: E402
+
+pooled_open_connection = db_utils._open_connection
+
+
+def legacy_open_connection(database_file):
+    """What get_db_connection did per call: default journal, no tuning."""
+    connection = sqlite3.connect(database_file, factory=db_utils.PooledConnection, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.create_aggregate("BIT_OR", 1, db_utils._BitOr)
+    return connection
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(files.router, prefix="/api/ftp/files")
+    # Not an admin, so permission checks run the full query.
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": 2, "is_admin": False, "username": "user1"}
+    return app
+
+
+async def run_load(app, total, concurrency):
+    """Returns (seconds, failed requests)."""
+    queue = asyncio.Queue()
+    failed = 0
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        nonlocal failed
+        while not queue.empty():
+            i = queue.get_nowait()
+            kind = i % 10
+            if kind < 5:
+                response = await client.get("/api/ftp/files/list-directory", params={"path": "data"})
+            elif kind < 7:
+                response = await client.get("/api/ftp/files/get-file", params={"path": f"data/file-{i % 100}.txt"})
+            elif kind < 9:
+                response = await client.get("/api/ftp/files/get-file-groups", params={"path": "data"})
+            else:
+                response = await client.put("/api/ftp/files/create-directory", params={"path": f"data/new-{i}"})
+            if response.status_code >= 500:
+                failed += 1
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return time.perf_counter() - started, failed
+
+
+def prepare(tmp, name):
+    db_utils.DATABASE_FILE = os.path.join(tmp, name)
+    db_utils.initialize_database()
+    db_utils.add_default_data()
+    data = os.path.join(SHARE, "data")
+    os.makedirs(data, exist_ok=True)
+    paths = [SHARE, data]
+    for i in range(100):
+        path = os.path.join(data, f"file-{i}.txt")
+        with open(path, "w") as f:
+            f.write("x" * i)
+        paths.append(path)
+    register_files(paths, 1)
+    # user1 (group 2) gets Read through the default groups.
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    permission_cache.maxsize = 0
+    details_cache.maxsize = 0
+    app = make_app()
+    pool_size = Config.DB_CONNECTION_POOL_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, opener, size in (
+            ("per-call connections", legacy_open_connection, 0),
+            ("pooled WAL connections", pooled_open_connection, pool_size),
+        ):
+            db_utils._open_connection = opener
+            Config.DB_CONNECTION_POOL_SIZE = size
+            prepare(tmp, f"{size}.db")
+            for entry in os.listdir(os.path.join(SHARE, "data")):
+                if entry.startswith("new-"):
+                    os.rmdir(os.path.join(SHARE, "data", entry))
+            elapsed, failed = asyncio.run(run_load(app, args.requests, args.concurrency))
+            db_utils.close_db_connections()
+            print(f"{label:>24}: {args.requests / elapsed:8,.0f} requests/s  ({elapsed:.2f} s, {failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Throughput of RangeFileResponse's pread path for range lengths from 64 KB to 1 GB,
+with fixed read block sizes versus the adaptive block size.
+
+Runs in-process against a temporary file (no server or network), so it measures the
+server-side cost of producing the body: threadpool round trips and copies.
+
+    python benchmarks/bench_download.py --file-mb 1024
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.datastructures import Headers  # noqa: E402
+from config import Config  # noqa: E402
+from utils.responses import RangeFileResponse  # noqa: E402
+
+KB = 1024
+MB = 1024 * KB
+RANGE_LENGTHS = [64 * KB, 1 * MB, 10 * MB, 100 * MB, 1024 * MB]
+FIXED_BLOCKS = [8 * KB, 64 * KB, 256 * KB, 1 * MB, 4 * MB]
+
+
+async def serve_range(path, length, min_block, max_block):
+    headers = Headers({"range": f"bytes=0-{length - 1}"})
+    response = RangeFileResponse(
+        path, headers, "bench.bin", min_block_size=min_block, max_block_size=max_block
+    )
+    received = 0
+
+    async def send(message):
+        nonlocal received
+        received += len(message.get("body", b""))
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    started = time.perf_counter()
+    await response({"type": "http", "extensions": {}}, receive, send)
+    elapsed = time.perf_counter() - started
+    assert received == length, (received, length)
+    return elapsed
+
+
+def label(size):
+    return f"{size // MB} MB" if size >= MB else f"{size // KB} KB"
+
+
+async def run(path, file_size, rounds):
+    columns = [(label(b), b, b) for b in FIXED_BLOCKS]
+    columns.append(("adaptive", Config.DOWNLOAD_MIN_BLOCK_SIZE, Config.DOWNLOAD_MAX_BLOCK_SIZE))
+
+    print("MB/s by range length (rows) and read block size (columns)")
+    print(f"{'range':>8}" + "".join(f"{name:>11}" for name, _, _ in columns))
+    for length in RANGE_LENGTHS:
+        if length > file_size:
+            continue
+        row = f"{label(length):>8}"
+        for _, min_block, max_block in columns:
+            best = min([await serve_range(path, length, min_block, max_block) for _ in range(rounds)])
+            row += f"{length / best / MB:11.0f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file-mb", type=int, default=1024, help="Size of the test file; caps the largest range")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".bin") as f:
+        block = os.urandom(MB)
+        for _ in range(args.file_mb):
+            f.write(block)
+        f.flush()
+        asyncio.run(run(f.name, args.file_mb * MB, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Listing cost of the old listdir + stat + isdir + tab-separated string round trip
+versus the os.scandir engine (utils.file_utils.scan_directory).
+
+    python benchmarks/bench_listing.py --entries 100000 --folders 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.utils as db_utils  # noqa: E402
+from utils.file_utils import format_size, scan_directory  # noqa: E402
+from utils.dir_sizes import get_directory_sizes  # noqa: E402
+
+
+def legacy_listing(directory):
+    """What list_files + list_directory did before: format to strings, then parse back."""
+    lines = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        st = os.stat(path)
+        if os.path.isdir(path):
+            size, is_folder = format_size(get_directory_sizes([path])[path]), True
+        else:
+            size, is_folder = format_size(st.st_size), False
+        mtime = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        lines.append(f"{size}\t{mtime}\t{name}\t{is_folder}")
+    result = []
+    for line in ("\r\n".join(lines) + "\r\n").split("\n"):
+        line = line.replace("\r", "")
+        if line:
+            size, mtime, name, is_folder = line.split("\t")
+            if not name.endswith(".part"):
+                result.append({"time": mtime, "name": name, "size": size, "is_folder": is_folder})
+    return result
+
+
+def scandir_listing(directory):
+    return [entry.to_dict() for entry in scan_directory(directory)]
+
+
+def best_of(fn, directory, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        count = len(fn(directory))
+        timings.append(time.perf_counter() - started)
+    return min(timings), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--folders", type=int, default=100, help="How many of the entries are folders")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.DATABASE_FILE = os.path.join(tmp, "bench.db")
+        db_utils.initialize_database()
+        directory = os.path.join(tmp, "share")
+        os.mkdir(directory)
+        for i in range(args.folders):
+            os.mkdir(os.path.join(directory, f"folder-{i:07d}"))
+        for i in range(args.entries - args.folders):
+            with open(os.path.join(directory, f"file-{i:07d}.txt"), "wb") as f:
+                f.write(b"x" * (i % 4096))
+        # Warm the folder size index so both variants measure listing, not first-time indexing.
+        scan_directory(directory)
+
+        print(f"{args.entries} entries ({args.folders} folders), best of {args.rounds}")
+        for label, fn in (("legacy", legacy_listing), ("scandir", scandir_listing)):
+            elapsed, count = best_of(fn, directory, args.rounds)
+            print(f"{label:>8}: {elapsed * 1000:8.1f} ms  ({count / elapsed:,.0f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
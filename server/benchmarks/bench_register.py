@@ -0,0 +1,89 @@
+"""
+Files registered per second: the old one-connection-per-file add_file_permissions loop
+versus one register_files call (utils.permissions).
+
+    python benchmarks/bench_register.py --files 50000 --folders 50 --legacy-files 2000
+
+The legacy loop commits once per file, so it is run on fewer files and compared by rate.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.utils as db_utils  # noqa: E402
+from config import Config  # noqa: E402
+from utils.permissions import get_parent_file, register_files  # noqa: E402
+
+
+def legacy_add_file_permissions(file_path, owner_id):
+    """What add_file_permissions did per file: own connection, row-by-row group inserts."""
+    connection = db_utils.get_db_connection()
+    cursor = connection.cursor()
+    parent_id = get_parent_file(cursor, file_path)
+    try:
+        cursor.execute(
+            "INSERT INTO files (file_path, owner_id, parent_id) VALUES (?, ?, ?)",
+            (file_path, owner_id, parent_id),
+        )
+        file_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO file_ancestors (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)", (file_id, file_id)
+        )
+        group_ids = [1, 2, 3]
+        if parent_id:
+            cursor.execute("SELECT group_id FROM file_groups WHERE file_id = ?", (parent_id,))
+            group_ids = [row["group_id"] for row in cursor.fetchall()] or group_ids
+        for group_id in group_ids:
+            cursor.execute("INSERT INTO file_groups (file_id, group_id) VALUES (?, ?)", (file_id, group_id))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def make_paths(root, files, folders):
+    folder_paths = [os.path.join(root, f"folder-{i:05d}") for i in range(folders)]
+    file_paths = [
+        os.path.join(folder_paths[i % folders], f"file-{i:07d}.bin") for i in range(files)
+    ]
+    return folder_paths, file_paths
+
+
+def fresh_database(tmp, name):
+    db_utils.DATABASE_FILE = os.path.join(tmp, name)
+    db_utils.initialize_database()
+    db_utils.add_default_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50_000)
+    parser.add_argument("--folders", type=int, default=50)
+    parser.add_argument("--legacy-files", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.SHARED_FOLDER = os.path.join(tmp, "share")
+
+        fresh_database(tmp, "legacy.db")
+        folders, files = make_paths(Config.SHARED_FOLDER, args.legacy_files, args.folders)
+        started = time.perf_counter()
+        for path in folders + files:
+            legacy_add_file_permissions(path, 1)
+        legacy = time.perf_counter() - started
+        count = len(folders) + len(files)
+        print(f"  legacy: {count:>7} files in {legacy:7.2f} s  ({count / legacy:>10,.0f} files/s)")
+
+        fresh_database(tmp, "batch.db")
+        folders, files = make_paths(Config.SHARED_FOLDER, args.files, args.folders)
+        started = time.perf_counter()
+        count = register_files(folders + files, 1)
+        batch = time.perf_counter() - started
+        print(f"   batch: {count:>7} files in {batch:7.2f} s  ({count / batch:>10,.0f} files/s)")
+
+
+if __name__ == "__main__":
+    main()
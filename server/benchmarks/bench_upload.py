@@ -0,0 +1,128 @@
+"""
+Compare chunk upload throughput of the multipart endpoint (POST /upload-chunk)
+against the raw octet-stream endpoint (PUT /upload-chunk-raw).
+
+Runs against a live server and only needs the standard library:
+
+    python benchmarks/bench_upload.py --url http://127.0.0.1:8000 \\
+        --username admin --password admin123 --size-mb 512 --chunk-mb 10 --workers 8
+"""
+import argparse
+import http.client
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+
+def login(base, username, password):
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80)
+    conn.request(
+        "POST",
+        "/api/ftp/auth/login",
+        body=json.dumps({"username": username, "password": password}),
+        headers={"Content-Type": "application/json"},
+    )
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    if response.status != 200 or "token" not in payload:
+        raise SystemExit(f"Login failed: {response.status} {payload}")
+    return payload["token"]
+
+
+def multipart_body(data: bytes, file_name: str):
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="chunk_data"; filename="{file_name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + data + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def send(base, token, method, url, body, headers):
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80)
+    headers = dict(headers, Cookie=f"token={token}", **{"Content-Length": str(len(body))})
+    conn.request(method, url, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {url} -> {response.status}")
+
+
+def upload(base, token, mode, data, chunk_size, path, workers):
+    file_id = f"bench-{mode}-{uuid.uuid4().hex[:8]}.bin"
+    total_chunks = max(1, (len(data) + chunk_size - 1) // chunk_size)
+
+    def put_chunk(i):
+        chunk = data[i * chunk_size:(i + 1) * chunk_size]
+        meta = {
+            "file_id": file_id,
+            "chunk_number": i,
+            "total_chunks": total_chunks,
+            "path": path,
+            "chunk_size": chunk_size,
+            "total_size": len(data),
+        }
+        if mode == "multipart":
+            body, content_type = multipart_body(chunk, file_id)
+            send(base, token, "POST", "/api/ftp/files/upload-chunk?" + urlencode(meta), body,
+                 {"Content-Type": content_type})
+        else:
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "X-File-Id": file_id,
+                "X-Chunk-Number": str(i),
+                "X-Total-Chunks": str(total_chunks),
+                "X-Path": path,
+                "X-Chunk-Size": str(chunk_size),
+                "X-Total-Size": str(len(data)),
+            }
+            send(base, token, "PUT", "/api/ftp/files/upload-chunk-raw", chunk, headers)
+
+    started = time.perf_counter()
+    # The last chunk finalizes the file, so it goes after all the others.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(put_chunk, range(total_chunks - 1)))
+    put_chunk(total_chunks - 1)
+    elapsed = time.perf_counter() - started
+
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80)
+    conn.request(
+        "DELETE",
+        "/api/ftp/files/delete?" + urlencode({"path": f"{path}/{file_id}" if path else file_id}),
+        headers={"Cookie": f"token={token}"},
+    )
+    conn.getresponse().read()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--path", default="", help="Destination folder relative to the share")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--chunk-mb", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    base = urlparse(args.url)
+    token = login(base, args.username, args.password)
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    chunk_size = args.chunk_mb * 1024 * 1024
+
+    print(f"{args.size_mb} MB file, {args.chunk_mb} MB chunks, {args.workers} parallel requests")
+    for mode in ("multipart", "raw"):
+        best = min(upload(base, token, mode, data, chunk_size, args.path, args.workers) for _ in range(args.rounds))
+        print(f"{mode:>10}: {len(data) / best / (1024 * 1024):8.1f} MB/s (best of {args.rounds}, {best:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
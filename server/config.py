@@ -16,4 +16,58 @@ class Config:
     SMTP_SERVER = os.getenv("SMTP_SERVER")
     SMTP_PORT = int(os.getenv("SMTP_PORT", 587))  # Default to 587
     SMTP_USERNAME = os.getenv("SMTP_USERNAME")
-    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
\ No newline at end of file
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+
+    # Ranged download streaming: the read block adapts between these bounds (bytes).
+    DOWNLOAD_MIN_BLOCK_SIZE = int(os.getenv("DOWNLOAD_MIN_BLOCK_SIZE", 64 * 1024))
+    DOWNLOAD_MAX_BLOCK_SIZE = int(os.getenv("DOWNLOAD_MAX_BLOCK_SIZE", 4 * 1024 * 1024))
+
+    # Seconds between full rescans of the folder size index; 0 disables the background reconciler.
+    DIR_SIZE_RECONCILE_INTERVAL = int(os.getenv("DIR_SIZE_RECONCILE_INTERVAL", 0))
+
+    # Sorted directory snapshots reused across list-directory pages: seconds a snapshot
+    # stays valid (it is also dropped as soon as the folder's mtime changes) and how many
+    # folders are kept.
+    LISTING_SNAPSHOT_TTL = int(os.getenv("LISTING_SNAPSHOT_TTL", 30))
+    LISTING_SNAPSHOT_MAX_DIRS = int(os.getenv("LISTING_SNAPSHOT_MAX_DIRS", 64))
+
+    # get-file results cache: entries kept and seconds each stays valid.
+    DETAILS_CACHE_SIZE = int(os.getenv("DETAILS_CACHE_SIZE", 1024))
+    DETAILS_CACHE_TTL = int(os.getenv("DETAILS_CACHE_TTL", 60))
+    # Folders watched with inotify (Linux) to drop cached listings on out-of-band changes; 0 disables.
+    CACHE_INOTIFY_MAX_WATCHES = int(os.getenv("CACHE_INOTIFY_MAX_WATCHES", 1024))
+
+    # can_access_file decisions cache. Writes through this process invalidate it at once;
+    # the TTL bounds staleness from changes made by other worker processes.
+    PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", 8192))
+    PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 30))
+
+    # Deleted items wait in the share's .trash folder and can be restored for TRASH_RETENTION
+    # seconds. The reaper runs every TRASH_REAP_INTERVAL seconds (0 disables it), removes at
+    # most TRASH_REAP_IOPS entries per second (0 = unthrottled) and purges database rows
+    # TRASH_PURGE_BATCH at a time.
+    TRASH_RETENTION = int(os.getenv("TRASH_RETENTION", 24 * 60 * 60))
+    TRASH_REAP_INTERVAL = int(os.getenv("TRASH_REAP_INTERVAL", 60))
+    TRASH_REAP_IOPS = int(os.getenv("TRASH_REAP_IOPS", 2000))
+    TRASH_PURGE_BATCH = int(os.getenv("TRASH_PURGE_BATCH", 5000))
+
+    # Upload sessions with no chunk received for UPLOAD_SESSION_TTL seconds are dropped,
+    # with their partial file, by a reaper running every UPLOAD_SESSION_REAP_INTERVAL
+    # seconds (0 disables it).
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 60 * 60))
+    UPLOAD_SESSION_REAP_INTERVAL = int(os.getenv("UPLOAD_SESSION_REAP_INTERVAL", 600))
+
+    # Thread pools for blocking work (utils/executors.py): disk I/O, SQLite, CPU-bound hashing.
+    IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", 32))
+    DB_POOL_WORKERS = int(os.getenv("DB_POOL_WORKERS", 8))
+    CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", os.cpu_count() or 2))
+    # Event loop lag sampling: seconds between samples (0 disables) and the lag, in
+    # milliseconds, that gets logged as a stall.
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+    LOOP_LAG_WARN_MS = int(os.getenv("LOOP_LAG_WARN_MS", 100))
+
+    # SQLite: idle connections kept open for reuse, and the pragmas every connection gets.
+    DB_CONNECTION_POOL_SIZE = int(os.getenv("DB_CONNECTION_POOL_SIZE", 16))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
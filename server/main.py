@@ -1,21 +1,54 @@
 
 
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from utils.utils import add_default_data,initialize_database
+from utils.utils import add_default_data,initialize_database,close_db_connections
+from utils.dir_sizes import directory_size_reconciler
+from utils.trash import trash_reaper
+from utils.upload_sessions import upload_session_reaper
+from utils.executors import monitor_event_loop_lag, shutdown_pools
+from utils.inotify import start_watcher, stop_watcher
+from utils.permissions import repair_parent_ids, file_ancestors_complete, rebuild_file_ancestors
 from routes.admin.main import router as admin_router
 from config import Config
 from routes import auth
 from routes import files
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if Config.DIR_SIZE_RECONCILE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(directory_size_reconciler(Config.DIR_SIZE_RECONCILE_INTERVAL)))
+    if Config.TRASH_REAP_INTERVAL > 0:
+        tasks.append(asyncio.create_task(trash_reaper(Config.TRASH_REAP_INTERVAL)))
+    if Config.UPLOAD_SESSION_REAP_INTERVAL > 0:
+        tasks.append(asyncio.create_task(upload_session_reaper(Config.UPLOAD_SESSION_REAP_INTERVAL)))
+    if Config.LOOP_LAG_INTERVAL > 0:
+        tasks.append(asyncio.create_task(monitor_event_loop_lag(Config.LOOP_LAG_INTERVAL)))
+    watcher = start_watcher(Config.CACHE_INOTIFY_MAX_WATCHES)
+    if watcher is not None:
+        asyncio.get_running_loop().add_reader(watcher.fd, watcher.read_events)
+    yield
+    for task in tasks:
+        task.cancel()
+    if watcher is not None:
+        asyncio.get_running_loop().remove_reader(watcher.fd)
+        stop_watcher()
+    shutdown_pools()
+    close_db_connections()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=Config.FRONTEND_URL,  
     allow_credentials=True,  
     allow_methods=["*"],  
     allow_headers=["*"],  
+    # The download hook reads these cross-origin to resume with Range/If-Range.
+    expose_headers=["ETag", "Content-Range", "Accept-Ranges", "Content-Length"],
 )
 app.include_router(auth.router, prefix="/api/ftp/auth")
 app.include_router(files.router, prefix="/api/ftp/files")
@@ -23,6 +56,8 @@ app.include_router(admin_router)
 
 initialize_database()
 add_default_data()
+if repair_parent_ids() or not file_ancestors_complete():
+    rebuild_file_ancestors()
 
 @app.get("/")
 async def root():
@@ -3,10 +3,12 @@ from typing import List, Optional
 import sqlite3
 from utils.utils import get_db_connection
 from utils.jwt import get_current_user
+from utils.executors import db_pool
 
 router = APIRouter(prefix="/activity", tags=["activity"])
 @router.get("/get-activities", response_model=List[dict])
-async def get_all_activities(
+@db_pool.offload
+def get_all_activities(
     skip: int = Query(0, description="Number of records to skip"),
     limit: int = Query(10, description="Number of records to return"),
     username: Optional[str] = Query(None, description="Filter by username"),
@@ -82,7 +84,8 @@ async def get_all_activities(
 
 
 @router.delete("/delete-activity/{activity_id}")
-async def delete_activity(activity_id: int,    current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def delete_activity(activity_id: int,    current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -105,7 +108,8 @@ async def delete_activity(activity_id: int,    current_user: dict = Depends(get_
         connection.close()
 
 @router.delete("/delete-all-activities")
-async def delete_all_activities(current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def delete_all_activities(current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status,Request
 from pydantic import BaseModel
-from utils.utils import get_db_connection,add_activity
+from utils.utils import get_db_connection,add_activity,permission_mask
 from utils.jwt import get_current_user
+from utils.executors import db_pool
+from utils.cache import details_cache
+from utils.permissions import bump_permissions_version
 from typing import  Optional,List
 import sqlite3
 
@@ -26,7 +29,8 @@ class UpdateGroupRequest(BaseModel):
     group_name: str
     description: str
 @router.delete("/delete/{group_id}", status_code=status.HTTP_200_OK)
-async def delete_group(
+@db_pool.offload
+def delete_group(
     group_id: int,
     request:Request,
     current_user: dict = Depends(get_current_user),
@@ -64,6 +68,9 @@ async def delete_group(
             )
 
             db.commit()
+            bump_permissions_version()
+            # Cached file details list each file's groups and their permissions.
+            details_cache.clear()
             return {"detail": "Group deleted successfully"}
     except HTTPException:
         raise
@@ -78,7 +85,8 @@ async def delete_group(
         db.close()
 
 @router.post("/create",status_code=status.HTTP_201_CREATED)
-async def add_group(
+@db_pool.offload
+def add_group(
     group_data: GroupCreateRequest,
     request:Request,
     current_user: dict = Depends(get_current_user)
@@ -132,7 +140,8 @@ async def add_group(
 
 
 @router.get("/get", status_code=status.HTTP_200_OK)
-async def get_groups(current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def get_groups(current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -159,7 +168,8 @@ async def get_groups(current_user: dict = Depends(get_current_user)):
         cursor.close()
         connection.close()
 @router.patch("/update/{group_id}", status_code=status.HTTP_200_OK)
-async def update_group(
+@db_pool.offload
+def update_group(
     group_id: int,
     request:Request,
     group_data: UpdateGroupRequest,
@@ -191,6 +201,7 @@ async def update_group(
             request=request
         )
         connection.commit()
+        details_cache.clear()
         return {"message": "Group updated successfully"}
     except sqlite3.IntegrityError as e:
         connection.rollback()
@@ -210,7 +221,8 @@ async def update_group(
         cursor.close()
         connection.close()
 @router.get("/get/{group_id}", status_code=status.HTTP_200_OK)
-async def get_group_by_id(
+@db_pool.offload
+def get_group_by_id(
     group_id: int,
     current_user: dict = Depends(get_current_user)
 ):
@@ -255,7 +267,8 @@ async def get_group_by_id(
         cursor.close()
         connection.close()
 @router.get("/get-with-details",status_code=status.HTTP_200_OK)
-async def get_all_groups(current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def get_all_groups(current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -293,7 +306,8 @@ async def get_all_groups(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/get-with-members/{group_id}", status_code=status.HTTP_200_OK)
-async def get_group_members(
+@db_pool.offload
+def get_group_members(
     group_id: int,
     current_user: dict = Depends(get_current_user)
 ):
@@ -336,7 +350,8 @@ async def get_group_members(
         connection.close()
 
 @router.post("/add-user/{group_id}", status_code=status.HTTP_200_OK)
-async def add_users_to_group(
+@db_pool.offload
+def add_users_to_group(
     group_id: int,
     data: AddUsersToGroupRequest,
     request:Request,
@@ -385,7 +400,7 @@ async def add_users_to_group(
             request=request
         )
         connection.commit()
-
+        bump_permissions_version()
 
         return {"detail": "Users added to group successfully"}
 
@@ -413,7 +428,8 @@ async def add_users_to_group(
         connection.close()
 
 @router.patch("/update-permissions/{group_id}", status_code=status.HTTP_200_OK)
-async def update_group_permissions(
+@db_pool.offload
+def update_group_permissions(
     group_id: int,
     permissions_request: UpdateGroupPermissionsRequest,
     request:Request,
@@ -445,8 +461,8 @@ async def update_group_permissions(
 
         for permission in permissions_request.permissions:
             cursor.execute(
-                "INSERT INTO group_permissions (group_id, permission) VALUES (?, ?)",
-                (group_id, permission),
+                "INSERT INTO group_permissions (group_id, permission, permission_mask) VALUES (?, ?, ?)",
+                (group_id, permission, permission_mask(permission)),
             )
 
         add_activity(
@@ -459,6 +475,8 @@ async def update_group_permissions(
             request=request
         )
         connection.commit()
+        bump_permissions_version()
+        details_cache.clear()
         return {"detail": "Permissions updated successfully"}
     except HTTPException:
         connection.rollback()
@@ -475,7 +493,8 @@ async def update_group_permissions(
 
 
 @router.get("/get-with-permissions/{group_id}", response_model=dict)
-async def get_group_permissions(
+@db_pool.offload
+def get_group_permissions(
     group_id: int,
     current_user: dict = Depends(get_current_user)
 ):
@@ -2,6 +2,12 @@ import sqlite3
 from fastapi import APIRouter, Depends, HTTPException, status, Request,Query
 from utils.utils import get_db_connection,add_activity
 from utils.jwt import get_current_user
+from utils.executors import db_pool, runtime_stats
+from utils.cache import listing_cache, details_cache, permission_cache
+from utils.permissions import permissions_version
+from utils.inotify import watcher_stats
+from utils.deletions import delete_stats
+from utils.trash import trash_stats
 from .users import router as users_router
 from .groups import router as groups_router
 from .activity import router as activity_router
@@ -13,6 +19,7 @@ router.include_router(groups_router)
 router.include_router(activity_router)
 
 @router.get("/dashboard-stats")
+@db_pool.offload
 def get_dashboard_stats(
     current_user: dict = Depends(get_current_user),
 ):
@@ -74,4 +81,48 @@ def get_dashboard_stats(
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard stats: {e}")
     finally:
         cursor.close()
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+
+@router.get("/cache-stats")
+@db_pool.offload
+def get_cache_stats(
+    current_user: dict = Depends(get_current_user),
+):
+    if not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view cache stats"
+        )
+    return {
+        "listing": listing_cache.stats(),
+        "details": details_cache.stats(),
+        "permissions": {**permission_cache.stats(), "version": permissions_version()},
+        "inotify": watcher_stats(),
+    }
+
+
+@router.get("/delete-stats")
+@db_pool.offload
+def get_delete_stats(
+    current_user: dict = Depends(get_current_user),
+):
+    if not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view delete stats"
+        )
+    return {**delete_stats(), "trash": trash_stats()}
+
+
+@router.get("/runtime-stats")
+async def get_runtime_stats(
+    current_user: dict = Depends(get_current_user),
+):
+    """Executor pool load and event loop lag. Answered on the loop itself, so it responds even with every pool busy."""
+    if not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view runtime stats"
+        )
+    return runtime_stats()
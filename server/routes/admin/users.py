@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status,Request,Query
 from pydantic import BaseModel,EmailStr
 from utils.utils import get_db_connection,add_activity
 from utils.jwt import get_current_user
+from utils.executors import db_pool, cpu_pool
+from utils.permissions import bump_permissions_version
 from typing import  Optional,List
 import bcrypt
 import sqlite3
@@ -37,6 +39,7 @@ class AddUserRequest(BaseModel):
     is_admin: bool = False
 
 @router.post("/create",status_code=status.HTTP_201_CREATED)
+@db_pool.offload
 def add_user(
     request:Request,
     create_user_data: AddUserRequest,
@@ -47,7 +50,7 @@ def add_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can add users"
         )
-    hashed_password = bcrypt.hashpw(create_user_data.password.encode("utf-8"), bcrypt.gensalt())
+    hashed_password = cpu_pool.call(bcrypt.hashpw, create_user_data.password.encode("utf-8"), bcrypt.gensalt())
     connection = get_db_connection()
     cursor = connection.cursor()
     try:
@@ -87,6 +90,7 @@ def add_user(
             request=request
         )
         connection.commit()
+        bump_permissions_version()
         return {"detail": "User added successfully", "user_id": user_id}
     except HTTPException:
         raise
@@ -105,6 +109,7 @@ def add_user(
         cursor.close()
         connection.close()
 @router.get("/get")
+@db_pool.offload
 def get_user(
     current_user: dict = Depends(get_current_user)
 ):
@@ -157,7 +162,8 @@ def get_user(
         cursor.close()
         connection.close()
 @router.get("/get/{user_id}", status_code=status.HTTP_200_OK)
-async def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -232,7 +238,8 @@ async def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_
 
 
 @router.delete("/delete/{user_id}", status_code=status.HTTP_200_OK)
-async def delete_user(
+@db_pool.offload
+def delete_user(
     user_id: int,
     request: Request,
     current_user: dict = Depends(get_current_user)
@@ -274,6 +281,7 @@ async def delete_user(
         )
 
         connection.commit()
+        bump_permissions_version()
 
         return {"detail": "User deleted successfully"}
 
@@ -298,7 +306,8 @@ async def delete_user(
 
 
 @router.get("/activity/{user_id}")
-async def get_user_activity(user_id: int, current_user: dict = Depends(get_current_user)):
+@db_pool.offload
+def get_user_activity(user_id: int, current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -337,7 +346,8 @@ async def get_user_activity(user_id: int, current_user: dict = Depends(get_curre
 
 
 @router.patch("/update/{user_id}", status_code=status.HTTP_200_OK)
-async def update_user(
+@db_pool.offload
+def update_user(
     user_id: int,
     request: Request,
     update_data: UpdateUserRequest,
@@ -434,6 +444,7 @@ async def update_user(
                 )
 
         connection.commit()
+        bump_permissions_version()
 
         return {"detail": "User updated successfully"}
 
@@ -460,7 +471,8 @@ async def update_user(
         connection.close()
 
 @router.get("/get-scroll", response_model=List[dict])
-async def get_all_users(
+@db_pool.offload
+def get_all_users(
     skip: int = Query(0, description="Number of records to skip"),
     limit: int = Query(10, description="Number of records to return")
 ):
@@ -491,7 +503,8 @@ async def get_all_users(
         connection.close()
 
 @router.patch("/update-password/{user_id}", status_code=status.HTTP_200_OK)
-async def update_password(
+@db_pool.offload
+def update_password(
     user_id: int,
     request: Request,
     update_data: UpdateUserPasswordRequest,
@@ -519,13 +532,13 @@ async def update_password(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        if not bcrypt.checkpw(update_data.old.encode("utf-8"), user["hash_password"]):
+        if not cpu_pool.call(bcrypt.checkpw, update_data.old.encode("utf-8"), user["hash_password"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Old password is incorrect"
             )
 
-        hashed_new_password = bcrypt.hashpw(update_data.new.encode("utf-8"), bcrypt.gensalt())
+        hashed_new_password = cpu_pool.call(bcrypt.hashpw, update_data.new.encode("utf-8"), bcrypt.gensalt())
         cursor.execute(
             "UPDATE users SET hash_password = ? WHERE id = ?",
             (hashed_new_password, user_id)
@@ -557,7 +570,8 @@ async def update_password(
         cursor.close()
         connection.close()
 @router.patch("/update-security-settings/{user_id}", status_code=status.HTTP_200_OK)
-async def update_security_settings(
+@db_pool.offload
+def update_security_settings(
     user_id: int,
     request: Request,
     user_data: UpdateUserSecuritySettingsRequest,
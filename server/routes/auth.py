@@ -4,6 +4,7 @@ import bcrypt
 from datetime import datetime
 from utils.utils import get_db_connection, add_activity
 from utils.jwt import generate_jwt, decode_and_validate_token
+from utils.executors import db_pool, cpu_pool, io_pool
 import time
 import secrets
 from email.mime.text import MIMEText
@@ -30,6 +31,12 @@ def generate_otp(digit: int = 6) -> str:
     otp = str(secrets.randbelow(upper_bound)).zfill(digit)
     return otp
 
+def _deliver_email(to_email: str, message: str):
+    with smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
+        server.starttls()
+        server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
+        server.sendmail(Config.SMTP_USERNAME, to_email, message)
+
 def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
     try:
         msg = MIMEMultipart()
@@ -40,10 +47,7 @@ def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
             msg.attach(MIMEText(body, "html"))
         else:
             msg.attach(MIMEText(body, "plain"))
-        with smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
-            server.starttls()
-            server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-            server.sendmail(Config.SMTP_USERNAME, to_email, msg.as_string())
+        io_pool.call(_deliver_email, to_email, msg.as_string())
         return {"message": "Email sent successfully!"}
     except Exception as e:
         print(e)
@@ -72,7 +76,7 @@ def validate_ip_restriction(user, request, cursor, connection):
 
 def validate_password(username, password, user, cursor, connection, request):
     stored_hash = user["hash_password"]
-    if not bcrypt.checkpw(password.encode('utf-8'), stored_hash):
+    if not cpu_pool.call(bcrypt.checkpw, password.encode('utf-8'), stored_hash):
         if username in otp_store:
             otp_store[username]["failed_attempts"] += 1
         else:
@@ -163,7 +167,8 @@ def update_user_activity(cursor, user_id):
 
 
 @router.post("/login", status_code=status.HTTP_200_OK)
-async def login(request: Request, user_data: LoginRequest, response: Response):
+@db_pool.offload
+def login(request: Request, user_data: LoginRequest, response: Response):
     username = user_data.username
     password = user_data.password
 
@@ -243,7 +248,8 @@ async def login(request: Request, user_data: LoginRequest, response: Response):
 
 
 @router.post("/verify-otp", status_code=status.HTTP_200_OK)
-async def verify_otp(request: Request, otp_data: VerifyOTP, response: Response):
+@db_pool.offload
+def verify_otp(request: Request, otp_data: VerifyOTP, response: Response):
     username = otp_data.username
     otp = otp_data.otp
 
@@ -1,4 +1,5 @@
 import os
+import time
 from fastapi import (
     APIRouter,
     Depends,
@@ -6,25 +7,65 @@ from fastapi import (
     Query,
     UploadFile,
     File,
+    Header,
     status,
     Request,
 )
 import shutil
-from fastapi.responses import FileResponse, StreamingResponse
-from utils.permissions import add_file_permissions,can_access_file
-import aiofiles
+from fastapi.responses import StreamingResponse
+from utils.permissions import (
+    add_file_permissions,
+    can_access_file,
+    is_file_tracked,
+    bump_permissions_version,
+    move_file_rows,
+)
 from utils.jwt import get_current_user
+from utils.executors import io_pool, db_pool
 from utils.utils import get_db_connection,add_activity
-from pydantic import BaseModel
-from typing import  List
+from utils.transfer import (
+    reassemble_chunks,
+    open_upload_target,
+    open_chunk_part,
+    write_chunk_at,
+    commit_upload_target,
+    iter_upload_file,
+    ingest_stream,
+)
+from utils.responses import RangeFileResponse, RangeNotSatisfiable
+from utils.dir_sizes import (
+    adjust_directory_size,
+    record_directory,
+    move_directory_tree,
+    get_indexed_directory_size,
+)
+from utils.deletions import TRASH_DIR_NAME
+from utils.trash import move_to_trash, restore_from_trash, get_trash_entry, list_trash
+from utils.cache import cache_key, details_cache, invalidate_path
+from utils.listing import MAX_PAGE_SIZE, entries_to_dicts, iter_ndjson, list_directory_page
+from utils.archive import ARCHIVE_FORMATS, walk_archive_entries, stream_tar, stream_zip
+from utils.upload_sessions import (
+    create_session,
+    get_session,
+    mark_chunk_received,
+    delete_session,
+    chunk_upload_session_id,
+    missing_chunks,
+    expected_chunk_length,
+    session_status,
+    session_target_path,
+    session_final_path,
+    get_chunk_checksums,
+)
+from utils.checksums import DEFAULT_ALGORITHM, new_hasher, combine_chunk_checksums, chunked_algorithm
+from pydantic import BaseModel, Field
+from typing import  List, Optional
 
 from utils.file_utils import (
-    list_files,
     validate_and_join_path,
     create_directory,
-    delete_recursive,
-    delete_folder,
-    get_file_details
+    get_file_details,
+    set_file_checksum,
 
 )
 from config import Config
@@ -41,7 +82,8 @@ ALLOWED_PERMISSIONS = {
 }
 
 @router.get("/get-file-groups", status_code=status.HTTP_200_OK)
-async def get_file_groups(
+@db_pool.offload
+def get_file_groups(
     path: str = Query(..., description="The file path"),
     current_user: dict = Depends(get_current_user),
 ):
@@ -110,7 +152,8 @@ class UpdateGroupPermissionsRequest(BaseModel):
     groups: List[dict]  
 
 @router.patch("/update-file-groups", status_code=status.HTTP_200_OK)
-async def update_file_groups(
+@db_pool.offload
+def update_file_groups(
     data: UpdateGroupPermissionsRequest,
     request: Request,
     path: str = Query(..., description="The file path"),
@@ -188,6 +231,8 @@ async def update_file_groups(
         )
 
         connection.commit()
+        bump_permissions_version()
+        details_cache.pop(cache_key(full_path))
         return {"detail": "File group permissions updated successfully"}
     except HTTPException:
         connection.rollback()
@@ -203,7 +248,8 @@ async def update_file_groups(
         connection.close()
 
 @router.get("/get-file",status_code=status.HTTP_200_OK)
-async def get_file(
+@io_pool.offload
+def get_file(
     path: str = Query(..., description="The file path"),
     current_user=Depends(get_current_user),
 
@@ -237,6 +283,13 @@ async def list_directory(
     path: str = Query(
         default=Config.SHARED_FOLDER, description="The directory path to list"
     ),
+    sort: Optional[str] = Query(default=None, description="Sort by name (default), size or mtime"),
+    order: str = Query(default="asc", description="asc or desc"),
+    prefix: Optional[str] = Query(default=None, description="Only names starting with this (case-insensitive)"),
+    extension: Optional[List[str]] = Query(default=None, description="Only names ending in one of these extensions"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for the whole folder"),
+    format: str = Query(default="json", description="json, or ndjson to stream unsorted entries one per line"),
     current_user=Depends(get_current_user),
 ):
     
@@ -244,7 +297,8 @@ async def list_directory(
     if not full_path:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid path")
 
-    allowed = can_access_file(
+    allowed = await db_pool.run(
+        can_access_file,
         file_path=full_path,
         user_id=current_user.get("user_id"),
         action="Read",
@@ -258,38 +312,45 @@ async def list_directory(
             detail="You do not have permission to access this directory",
         )
 
-    files = list_files(full_path).split("\n")
-    clean_files = []
-
-    for file in files:
-        clean = file.replace("\r", "")
-        if clean:
-            file_info = clean.split("\t")
-            if len(file_info) >= 3:  
-                file_name = file_info[2] 
-                if not file_name.endswith(".part"):
-                    file_details = {
-                        "time": file_info[1],  
-                        "name": file_name,    
-                        "size": file_info[0],  
-                        "is_folder": file_info[3], 
-                    }
-                    clean_files.append(file_details)
-    return {"message": clean_files}
+    if not await io_pool.run(os.path.isdir, full_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Directory not found")
 
-@router.post("/upload-chunk")
-async def upload_chunk(
-    file_id: str = Query(..., description="Unique identifier for the file"),
-    chunk_number: int = Query(..., description="Current chunk number"),
-    total_chunks: int = Query(..., description="Total number of chunks"),
-    path: str = Query(
-        default=Config.SHARED_FOLDER, description="The directory path to list"
-    ),
-    chunk_data: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    if format == "ndjson":
+        if sort or cursor or limit:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ndjson listings are streamed unsorted and cannot be paginated",
+            )
+        return StreamingResponse(
+            iter_ndjson(full_path, current_user.get("user_id"), prefix, extension),
+            media_type="application/x-ndjson"
+        )
+    if format != "json":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be json or ndjson")
 
-):  
-    
+    try:
+        page = await io_pool.run(
+            list_directory_page, full_path, sort or "name", order, prefix, extension, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    clean_files = await db_pool.run(
+        entries_to_dicts, full_path, page["entries"], current_user.get("user_id")
+    )
+    return {"message": clean_files, "next_cursor": page["next_cursor"], "total": page["total"]}
+
+def _is_valid_file_name(file_name: str) -> bool:
+    """A plain name inside the upload folder: no separators, not an upload part or the trash."""
+    return (
+        bool(file_name)
+        and file_name not in (".", "..", TRASH_DIR_NAME)
+        and not file_name.endswith(".part")
+        and os.path.basename(file_name.replace("\\", "/")) == file_name
+    )
+
+
+def _check_upload_access(path: str, current_user: dict) -> str:
     full_path = validate_and_join_path(path)
     if not full_path:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid path")
@@ -305,20 +366,51 @@ async def upload_chunk(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to upload chunks to this file",
         )
+    return full_path
+
+
+async def store_chunk(
+    body,
+    file_id: str,
+    chunk_number: int,
+    total_chunks: int,
+    full_path: str,
+    chunk_size: Optional[int],
+    total_size: Optional[int],
+    user_id: int,
+):
+    """Shared by the multipart and raw chunk endpoints; `body` is an async iterable of bytes."""
+    if not _is_valid_file_name(file_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file id")
+    if total_chunks < 1 or not 0 <= chunk_number < total_chunks:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chunk number out of range")
+    # Preallocated mode: every chunk is written in place into one file sized up front,
+    # so finishing the upload is an fsync + rename instead of a reassembly pass.
+    if chunk_size is not None and total_size is not None:
+        return await _store_preallocated_chunk(
+            body, file_id, chunk_number, total_chunks, full_path, chunk_size, total_size, user_id
+        )
     try:
         chunk_path = os.path.join(full_path, f"{file_id}_chunk_{chunk_number}.part")
-
-        async with aiofiles.open(chunk_path, "wb") as f:
-            content = await chunk_data.read()
-            await f.write(content)
-
-        if chunk_number == total_chunks - 1:          
-            await reassemble_file(file_id, total_chunks, full_path,current_user.get("user_id"))       
-                 
-        return {
+        fd = await io_pool.run(open_chunk_part, chunk_path)
+        hasher = new_hasher()
+        try:
+            await ingest_stream(body, fd, 0, hasher=hasher)
+        finally:
+            os.close(fd)
+
+        response = {
             "status": "success",
             "message": f"Chunk {chunk_number} uploaded successfully",
+            "checksum": hasher.hexdigest(),
+            "checksum_algorithm": DEFAULT_ALGORITHM,
         }
+        if chunk_number == total_chunks - 1:          
+            response["reassembly"] = await io_pool.run(reassemble_file, file_id, total_chunks, full_path, user_id)       
+                 
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -326,23 +418,171 @@ async def upload_chunk(
         )
 
 
-async def reassemble_file(file_id: str, total_chunks: int, path: str,user_id:int):
+@router.post("/upload-chunk")
+async def upload_chunk(
+    file_id: str = Query(..., description="Unique identifier for the file"),
+    chunk_number: int = Query(..., description="Current chunk number"),
+    total_chunks: int = Query(..., description="Total number of chunks"),
+    path: str = Query(
+        default=Config.SHARED_FOLDER, description="The directory path to list"
+    ),
+    chunk_size: Optional[int] = Query(
+        default=None, gt=0, description="Size of every chunk except the last (enables preallocated mode)"
+    ),
+    total_size: Optional[int] = Query(
+        default=None, ge=0, description="Final file size in bytes (enables preallocated mode)"
+    ),
+    chunk_data: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+
+):  
+    full_path = await db_pool.run(_check_upload_access, path, current_user)
+    return await store_chunk(
+        iter_upload_file(chunk_data),
+        file_id,
+        chunk_number,
+        total_chunks,
+        full_path,
+        chunk_size,
+        total_size,
+        current_user.get("user_id"),
+    )
+
+
+@router.put("/upload-chunk-raw")
+async def upload_chunk_raw(
+    request: Request,
+    file_id: str = Header(..., alias="X-File-Id"),
+    chunk_number: int = Header(..., alias="X-Chunk-Number"),
+    total_chunks: int = Header(..., alias="X-Total-Chunks"),
+    path: str = Header(default="", alias="X-Path"),
+    chunk_size: Optional[int] = Header(default=None, gt=0, alias="X-Chunk-Size"),
+    total_size: Optional[int] = Header(default=None, ge=0, alias="X-Total-Size"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+        Same as upload-chunk, but the chunk is the raw application/octet-stream body and
+        the metadata travels in X-* headers. The body is streamed straight to disk, so the
+        multipart parser and its SpooledTemporaryFile copy are skipped entirely.
+    """
+    full_path = await db_pool.run(_check_upload_access, path, current_user)
+    return await store_chunk(
+        request.stream(),
+        file_id,
+        chunk_number,
+        total_chunks,
+        full_path,
+        chunk_size,
+        total_size,
+        current_user.get("user_id"),
+    )
+
+
+async def _store_preallocated_chunk(
+    body,
+    file_id: str,
+    chunk_number: int,
+    total_chunks: int,
+    full_path: str,
+    chunk_size: int,
+    total_size: int,
+    user_id: int,
+):
+    """
+        Chunks may arrive in any order and in parallel, so each one is recorded in an
+        upload session's bitmap (utils/upload_sessions.py) and the file is committed by
+        whichever request completes it, not by the one numbered total_chunks - 1.
+    """
+    session_id = chunk_upload_session_id(user_id, full_path, file_id, total_size, chunk_size)
+    session = await db_pool.run(
+        create_session, user_id, full_path, file_id, total_size, chunk_size, DEFAULT_ALGORITHM, session_id
+    )
+    if session["total_chunks"] != total_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"total_size and chunk_size make {session['total_chunks']} chunks, not {total_chunks}",
+        )
+
+    expected = expected_chunk_length(session, chunk_number)
+    hasher = new_hasher()
     try:
-        full_file_path = os.path.join(path, file_id)
-    
-        async with aiofiles.open(full_file_path, "wb") as final_file:
-            for i in range(total_chunks):
-                chunk_path = os.path.join(path, f"{file_id}_chunk_{i}.part")
-                async with aiofiles.open(chunk_path, "rb") as chunk:
-                    content = await chunk.read()
-                    await final_file.write(content)
-                os.remove(chunk_path)
-        add_file_permissions(
-            file_path=full_file_path,
-            owner_id=user_id,
-        )  
+        fd = await io_pool.run(open_upload_target, session_target_path(session), total_size)
+        try:
+            written = await ingest_stream(body, fd, chunk_number * chunk_size, max_bytes=expected, hasher=hasher)
+        finally:
+            os.close(fd)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    if written != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk {chunk_number} must be {expected} bytes, got {written}",
+        )
+
+    checksum = hasher.hexdigest()
+    updated = await db_pool.run(mark_chunk_received, session_id, chunk_number, checksum)
+    if updated is None:
+        # Another request committed the upload while this chunk streamed in. The target
+        # may be the file it is renaming, so it isn't removed here; an empty session
+        # puts it in the reaper's hands in case this write recreated it.
+        await db_pool.run(
+            create_session, user_id, full_path, file_id, total_size, chunk_size, DEFAULT_ALGORITHM, session_id
+        )
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload already completed")
+
+    response = {
+        "status": "success",
+        "message": f"Chunk {chunk_number} uploaded successfully",
+        "checksum": checksum,
+        "checksum_algorithm": DEFAULT_ALGORITHM,
+    }
+    if not missing_chunks(updated):
+        response["committed"] = await io_pool.run(_commit_chunk_upload, updated, user_id)
+    return response
+
+
+def _commit_chunk_upload(session: dict, user_id: int) -> bool:
+    """Commit a complete preallocated upload; False if a parallel request already did."""
+    chunk_checksums = get_chunk_checksums(session["id"])
+    # Deleting the session is the claim: only one of the requests that saw it complete wins.
+    if not delete_session(session["id"]):
+        return False
+    final_path = session_final_path(session)
+    commit_preallocated_file(session_target_path(session), final_path, session["total_size"], user_id)
+    checksum = combine_chunk_checksums(
+        DEFAULT_ALGORITHM, [chunk_checksums[i] for i in range(session["total_chunks"])]
+    )
+    set_file_checksum(final_path, checksum, chunked_algorithm(DEFAULT_ALGORITHM), session["chunk_size"])
+    return True
 
 
+def reassemble_file(file_id: str, total_chunks: int, path: str,user_id:int):
+    try:
+        full_file_path = os.path.join(path, file_id)
+        previous_size = os.path.getsize(full_file_path) if os.path.isfile(full_file_path) else 0
+        already_tracked = os.path.exists(full_file_path) and is_file_tracked(full_file_path)
+
+        stats = reassemble_chunks(path, file_id, total_chunks)
+        adjust_directory_size(path, stats["bytes"] - previous_size)
+        invalidate_path(full_file_path)
+        print(
+            f"Reassembled {full_file_path}: {stats['bytes']} bytes in {stats['seconds']:.3f}s "
+            f"({stats['bytes_per_second'] / (1024 * 1024):.2f} MB/s)"
+        )
+        if already_tracked:
+            # These uploads carry no whole-file checksum; the old one no longer applies.
+            set_file_checksum(full_file_path, None, None)
+        else:
+            add_file_permissions(
+                file_path=full_file_path,
+                owner_id=user_id,
+            )
+        return stats
 
     except Exception as e:
         print("Error reassembling file:", e)
@@ -351,19 +591,266 @@ async def reassemble_file(file_id: str, total_chunks: int, path: str,user_id:int
         )
 
 
-@router.get("/download")
+def commit_preallocated_file(target_path: str, final_path: str, total_size: int, user_id: int):
+    try:
+        previous_size = os.path.getsize(final_path) if os.path.isfile(final_path) else 0
+        already_tracked = os.path.exists(final_path) and is_file_tracked(final_path)
+        commit_upload_target(target_path, final_path, total_size)
+        adjust_directory_size(os.path.dirname(final_path), total_size - previous_size)
+        invalidate_path(final_path)
+        # Overwriting an existing file keeps its row and permissions, but not its checksum.
+        if already_tracked:
+            set_file_checksum(final_path, None, None)
+        else:
+            add_file_permissions(
+                file_path=final_path,
+                owner_id=user_id,
+            )
+    except Exception as e:
+        print("Error committing file:", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+class CreateUploadSessionRequest(BaseModel):
+    file_name: str
+    path: str = ""
+    total_size: int = Field(..., ge=0)
+    chunk_size: int = Field(..., gt=0)
+    checksum_algorithm: str = DEFAULT_ALGORITHM
+
+
+def _get_owned_session(session_id: str, current_user: dict) -> dict:
+    session = get_session(session_id)
+    if (
+        session is None
+        or session["user_id"] != current_user.get("user_id")
+        or session["expires_at"] <= time.time()
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return session
+
+
+def _remove_if_exists(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _get_writable_session(session_id: str, current_user: dict) -> dict:
+    """_get_owned_session, plus Write access to its folder checked again, as it may have been revoked."""
+    session = _get_owned_session(session_id, current_user)
+    allowed = can_access_file(
+        file_path=session["directory"],
+        user_id=current_user.get("user_id"),
+        action="Write",
+    )
+    if allowed is False or allowed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to upload to this directory",
+        )
+    return session
+
+
+@router.post("/upload-sessions", status_code=status.HTTP_201_CREATED)
+@db_pool.offload
+def create_upload_session(
+    data: CreateUploadSessionRequest,
+    current_user: dict = Depends(get_current_user),
+):
+    full_path = validate_and_join_path(data.path)
+    if not full_path:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid path")
+
+    if not _is_valid_file_name(data.file_name):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file name")
+
+    try:
+        new_hasher(data.checksum_algorithm)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    allowed = can_access_file(
+        file_path=full_path,
+        user_id=current_user.get("user_id"),
+        action="Write",
+    )
+    if allowed is False or allowed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to upload to this directory",
+        )
+
+    session = create_session(
+        current_user.get("user_id"),
+        full_path,
+        data.file_name,
+        data.total_size,
+        data.chunk_size,
+        data.checksum_algorithm,
+    )
+    return session_status(session)
+
+
+@router.get("/upload-sessions/{session_id}")
+@db_pool.offload
+def get_upload_session(
+    session_id: str,
+    include_checksums: bool = Query(default=False, description="Include the checksum of every received chunk"),
+    current_user: dict = Depends(get_current_user),
+):
+    result = session_status(_get_owned_session(session_id, current_user))
+    if include_checksums:
+        result["chunk_checksums"] = get_chunk_checksums(session_id)
+    return result
+
+
+@router.put("/upload-sessions/{session_id}/chunks/{chunk_number}")
+async def put_upload_session_chunk(
+    session_id: str,
+    chunk_number: int,
+    request: Request,
+    expected_checksum: Optional[str] = Header(default=None, alias="X-Chunk-Checksum"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+        The chunk is the raw request body (application/octet-stream). It is streamed
+        straight into the target file, so no multipart parsing or temp-file spooling
+        happens and memory stays constant regardless of chunk size.
+        The chunk is hashed while it streams; if X-Chunk-Checksum is sent and doesn't
+        match, the chunk is not marked as received and can simply be sent again.
+    """
+    session = await db_pool.run(_get_writable_session, session_id, current_user)
+    if chunk_number < 0 or chunk_number >= session["total_chunks"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chunk number out of range")
+
+    expected = expected_chunk_length(session, chunk_number)
+    hasher = new_hasher(session["checksum_algorithm"])
+    try:
+        fd = await io_pool.run(open_upload_target, session_target_path(session), session["total_size"])
+        try:
+            written = await ingest_stream(
+                request.stream(), fd, chunk_number * session["chunk_size"], max_bytes=expected, hasher=hasher
+            )
+        finally:
+            os.close(fd)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+    if written != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk {chunk_number} must be {expected} bytes, got {written}",
+        )
+
+    checksum = hasher.hexdigest()
+    if expected_checksum and expected_checksum.lower() != checksum:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Checksum mismatch for chunk {chunk_number}: expected {expected_checksum}, got {checksum}",
+        )
+
+    # Only mark the chunk once its bytes are on disk, so a crash never leaves a hole marked as received.
+    updated = await db_pool.run(mark_chunk_received, session_id, chunk_number, checksum)
+    if updated is None:
+        # Aborted or expired while the chunk streamed in; don't leave its bytes behind.
+        await io_pool.run(_remove_if_exists, session_target_path(session))
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return {
+        "status": "success",
+        "message": f"Chunk {chunk_number} uploaded successfully",
+        "received_chunks": updated["total_chunks"] - len(missing_chunks(updated)),
+        "checksum": checksum,
+        "checksum_algorithm": session["checksum_algorithm"],
+    }
+
+
+@router.post("/upload-sessions/{session_id}/commit")
+@io_pool.offload
+def commit_upload_session(
+    session_id: str,
+    expected_checksum: Optional[str] = Header(default=None, alias="X-File-Checksum"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+        The file checksum is the hash of the chunk digests in chunk order (see
+        utils.checksums.combine_chunk_checksums), so it is reported and stored as
+        "<algorithm>-chunks" with the chunk size. On a mismatch the session is kept so the
+        client can compare chunk checksums and re-send only the bad chunks.
+    """
+    session = _get_writable_session(session_id, current_user)
+    missing = missing_chunks(session)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Upload is incomplete", "missing_chunks": missing},
+        )
+
+    chunk_checksums = get_chunk_checksums(session_id)
+    algorithm = session["checksum_algorithm"]
+    checksum = combine_chunk_checksums(
+        algorithm, [chunk_checksums[i] for i in range(session["total_chunks"])]
+    )
+    if expected_checksum and expected_checksum.lower() != checksum:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "File checksum mismatch",
+                "checksum": checksum,
+                "chunk_checksums": chunk_checksums,
+            },
+        )
+
+    target_path = session_target_path(session)
+    final_path = session_final_path(session)
+    if session["total_size"] == 0 and not os.path.exists(target_path):
+        write_chunk_at(target_path, 0, 0, b"")
+
+    commit_preallocated_file(target_path, final_path, session["total_size"], current_user.get("user_id"))
+    set_file_checksum(final_path, checksum, chunked_algorithm(algorithm), session["chunk_size"])
+    delete_session(session_id)
+    return {
+        "status": "success",
+        "message": f"File {session['file_name']} uploaded successfully",
+        "file_path": final_path,
+        "checksum": checksum,
+        "checksum_algorithm": chunked_algorithm(algorithm),
+        "chunk_size": session["chunk_size"],
+    }
+
+
+@router.delete("/upload-sessions/{session_id}")
+@io_pool.offload
+def abort_upload_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    session = _get_owned_session(session_id, current_user)
+    _remove_if_exists(session_target_path(session))
+    delete_session(session_id)
+    return {"status": "success", "message": "Upload session aborted"}
+
+
+@router.api_route("/download", methods=["GET", "HEAD"])
 async def download_file(
+    request: Request,
     file_name: str = Query(...),
     path: str = Query(default=Config.SHARED_FOLDER),
     current_user: dict = Depends(get_current_user),
-    request: Request = None,
 ):
     full_path = validate_and_join_path(path)
 
     if not full_path:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid path")
     
-    allowed = can_access_file(
+    allowed = await db_pool.run(
+        can_access_file,
         file_path=full_path,
         user_id=current_user.get("user_id"),
         action="Read",
@@ -374,73 +861,94 @@ async def download_file(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to upload chunks to this file",
         )
+    if not _is_valid_file_name(file_name):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file name")
     try:
         file_path = os.path.join(full_path, file_name)
+        # A symlink in the folder must not lead outside it either.
+        real_dir = os.path.realpath(full_path)
+        if not os.path.realpath(file_path).startswith(real_dir + os.sep):
+            raise HTTPException(status_code=404, detail="File not found")
 
-        if not os.path.exists(file_path):
+        if not os.path.isfile(file_path):
             raise HTTPException(status_code=404, detail="File not found")
 
-        file_size = os.path.getsize(file_path)
-        range_header = request.headers.get("Range")
-
-        # Checks if the Range header is present in the request. This header is used for partial downloads (e.g., bytes=0-999).
-        if not range_header:
-            return FileResponse(
-                file_path,
-                headers={
-                    "Content-Disposition": f"attachment; filename={file_name}",
-                    "Accept-Ranges": "bytes",  # Informs the client that the server supports range requests.
-                    "Content-Length": str(file_size),
-                },
-                media_type="application/octet-stream",
-            )
+        # Handles no Range (200), single and suffix ranges (206), several ranges
+        # (206 multipart/byteranges) and If-Range revalidation against the ETag.
+        return RangeFileResponse(
+            file_path,
+            request_headers=request.headers,
+            filename=file_name,
+            method=request.method,
+        )
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{os.path.getsize(file_path)}"},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        start, end = 0, file_size - 1
-        range_parts = range_header.replace("bytes=", "").split(
-            "-"
-        )  # range_header.replace("bytes=", "").split("-"): Extracts the start and end bytes from the Range header (e.g., bytes=999-999*2 → ["0", "999"]).
-        start = int(range_parts[0])
-        end = int(range_parts[1]) if range_parts[1] else file_size - 1
 
-        if start >= file_size or end >= file_size or start > end:
-            raise HTTPException(
-                status_code=416, detail="Requested range not satisfiable"
-            )
+@router.get("/download-archive")
+async def download_archive(
+    path: str = Query(default=Config.SHARED_FOLDER, description="The folder to archive"),
+    format: str = Query(default="zip", description="Archive format: zip or tar"),
+    compress: bool = Query(default=False, description="Deflate zip entries instead of storing them"),
+    resume_after: Optional[str] = Query(
+        default=None, description="Skip entries up to and including this relative path"
+    ),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+        Stream a folder as a zip or tar archive, built on the fly with bounded memory.
+        Entries come in a fixed sorted order, so a broken download can be continued with
+        resume_after set to the last entry that arrived complete.
+    """
+    full_path = validate_and_join_path(path)
+    if not full_path:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid path")
 
-        content_length = end - start + 1
-
-        async def file_stream():
-            async with aiofiles.open(file_path, "rb") as file:
-                await file.seek(start)
-                remaining_bytes = content_length
-                while remaining_bytes > 0:
-                    chunk_size = min(8192, remaining_bytes)
-                    chunk = await file.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-                    remaining_bytes -= chunk_size
-
-        headers = {
-            "Content-Disposition": f"attachment; filename={file_name}",
-            "Content-Range": f"bytes {start}-{end}/{file_size}",
-            "Content-Length": str(content_length),
-            "Accept-Ranges": "bytes",
-        }
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format must be zip or tar")
 
-        return StreamingResponse(
-            file_stream(),
-            status_code=206,
-            headers=headers,
-            media_type="application/octet-stream",
+    allowed = await db_pool.run(
+        can_access_file,
+        file_path=full_path,
+        user_id=current_user.get("user_id"),
+        action="Read",
+    )
+    if allowed is False or allowed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access this directory",
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if not await io_pool.run(os.path.isdir, full_path):
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    entries = walk_archive_entries(full_path, current_user.get("user_id"), resume_after)
+    if format == "tar":
+        body, media_type = stream_tar(entries), "application/x-tar"
+    else:
+        body, media_type = stream_zip(entries, compress), "application/zip"
+
+    archive_name = f"{os.path.basename(full_path.rstrip('/')) or 'archive'}.{format}"
+    # A plain generator: StreamingResponse iterates it in the threadpool, so the
+    # directory walk and file reads stay off the event loop.
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={archive_name}"},
+    )
 
 
 @router.put("/create-directory")
-async def create_director(
+@io_pool.offload
+def create_director(
     path: str = Query(description="The directory path to list"),
     current_user: dict = Depends(get_current_user)
 
@@ -464,6 +972,8 @@ async def create_director(
     if os.path.exists(file_path):
         raise HTTPException(status_code=400, detail="Directory already exists")
     create_directory(file_path)
+    record_directory(file_path)
+    invalidate_path(file_path)
 
     add_file_permissions(file_path=file_path, owner_id=current_user.get("user_id"))
     return {
@@ -473,7 +983,8 @@ async def create_director(
 
 
 @router.delete("/delete")
-async def delete(
+@io_pool.offload
+def delete(
     path: str = Query(default="", description="The directory path to list"),
     force: bool = Query(default=False, description="Force delete non-empty folder"),
     current_user=Depends(get_current_user),
@@ -499,71 +1010,75 @@ async def delete(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File or folder not found")
 
-    if os.path.isdir(file_path):
-        if os.listdir(file_path) and not force:
-            raise HTTPException(
-                status_code=400, detail="Folder is not empty. Cannot delete."
-            )
-        if force:
-            delete_recursive(file_path)
-            return {
-                "message": "Folder and its contents deleted successfully",
-                "file_path": file_path,
-            }
-
-
-
-    if os.path.isfile(file_path):
-        os.remove(file_path)
-    else:
-        delete_folder(file_path)
+    if file_path == os.path.abspath(Config.SHARED_FOLDER):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete the shared folder")
+    if os.path.isdir(file_path) and not force and os.listdir(file_path):
+        raise HTTPException(
+            status_code=400, detail="Folder is not empty. Cannot delete."
+        )
 
-    
-    delete_file(file_path, current_user.get("user_id"))
+    try:
+        entry = move_to_trash(file_path, current_user.get("user_id"))
+    except OSError as e:
+        print(f"Error moving {file_path} to the trash: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to delete file or folder",
+        )
     return {
         "message": "File or folder deleted successfully",
         "file_path": file_path,
+        # None when the item was on another volume and was deleted for good.
+        "trash_id": entry["id"] if entry else None,
     }
 
-def delete_file(file_path: str, user_id: int):
 
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
-    try:
-      
-   
-        # Delete file from the database
-        cursor.execute(
-            """
-            DELETE FROM files WHERE file_path = ?
-            """,
-            (file_path,)
-        )
+@router.get("/trash")
+@db_pool.offload
+def get_trash(current_user: dict = Depends(get_current_user)):
+    """Deleted items that can still be restored; admins see everyone's."""
+    user_id = None if current_user.get("is_admin") else current_user.get("user_id")
+    entries = list_trash(user_id)
+    return {"entries": entries}
 
 
-        add_activity(
-            cursor=cursor,
-            activity_type="File Management",
-            details=f"Deleted file: {file_path}",
-            category="File Management",
-            user_id=user_id,
-            changed_by=user_id
+@router.post("/restore")
+@io_pool.offload
+def restore(
+    id: int = Query(..., description="The trash entry to restore"),
+    current_user: dict = Depends(get_current_user),
+):
+    entry = get_trash_entry(id)
+    if entry is None or entry["status"] != "trashed" or (
+        not current_user.get("is_admin") and entry["deleted_by"] != current_user.get("user_id")
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found in the trash")
+
+    try:
+        file_path = restore_from_trash(entry, current_user.get("user_id"))
+    except LookupError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found in the trash")
+    except FileExistsError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Something else now exists at the original location",
         )
-      
-        connection.commit()
-        return True
-    
-    except Exception as e:
-        connection.rollback()
-        print(f"Error deleting file: {e}")
-        return False
-    
-    finally:
-        connection.close()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The original folder no longer exists",
+        )
+    except OSError as e:
+        print(f"Error restoring {entry['original_path']}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to restore file or folder",
+        )
+    return {"message": "File or folder restored successfully", "file_path": file_path}
 
 @router.post("/move")
-async def move(
+@io_pool.offload
+def move(
     fromPath: str = Query(default="", description="The source path to move from"),
     toPath: str = Query(default="", description="The destination path to move to"),
     force: bool = Query(default=False, description="Force move, overwriting existing files or directories"),
@@ -594,9 +1109,37 @@ async def move(
 
     if not os.path.isdir(toPath_root):
         raise HTTPException(status_code=400, detail="Source path is not a directory")
+    moved_size = (
+        get_indexed_directory_size(fromPath_root)
+        if os.path.isdir(fromPath_root)
+        else os.path.getsize(fromPath_root)
+    )
     try:
-        shutil.move(fromPath_root, toPath_root)
+        new_path = shutil.move(fromPath_root, toPath_root)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to move: {str(e)}")
+    invalidate_path(fromPath_root, recursive=True)
+    invalidate_path(new_path, recursive=True)
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        move_directory_tree(fromPath_root, new_path, moved_size, cursor)
+        move_file_rows(cursor, fromPath_root, new_path)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        print(f"Error updating the index after move: {e}")
+        # Put the tree back so the disk matches the rows again.
+        shutil.move(new_path, fromPath_root)
+        invalidate_path(new_path, recursive=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to move file or folder",
+        )
+    finally:
+        cursor.close()
+        connection.close()
+    bump_permissions_version()
 
     return {"message": "Move operation successful", "fromPath": fromPath_root, "toPath": toPath_root}
\ No newline at end of file
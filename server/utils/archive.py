@@ -0,0 +1,147 @@
+import os
+import stat
+import tarfile
+import time
+import zipfile
+from utils.deletions import is_trash_path, TRASH_DIR_NAME
+from utils.permissions import evaluate_permissions
+from utils.utils import get_db_connection, subtree_bounds
+
+ARCHIVE_BLOCK_SIZE = 1024 * 1024
+ARCHIVE_FORMATS = ("tar", "zip")
+
+
+def _path_key(relative_path: str) -> tuple:
+    return tuple(relative_path.split("/"))
+
+
+def _tracked_paths(root: str) -> set:
+    """Every files.file_path at or below root, fetched with one query."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        low, high = subtree_bounds(root)
+        cursor.execute(
+            "SELECT file_path FROM files WHERE file_path = ? OR (file_path > ? AND file_path < ?)",
+            (root, low, high),
+        )
+        return {row["file_path"] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def walk_archive_entries(root: str, user_id: int, resume_after: str = None):
+    """
+        Yield (relative_path, absolute_path, stat_result) for every readable entry below
+        root, depth first with names sorted at each level. The order is deterministic, so
+        an interrupted download can continue with resume_after=<last complete entry>.
+        Entries with their own files row need the read capability, evaluated for a whole
+        folder at a time with evaluate_permissions; untracked entries inherit their
+        folder's decision, like /download does. Symlinks,
+        in-progress uploads (.part) and the trash folder are skipped.
+    """
+    tracked = _tracked_paths(root)
+    resume_key = _path_key(resume_after.strip("/")) if resume_after else None
+
+    def walk(directory, prefix):
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"Error reading {directory} for archive: {e}")
+            return
+        tracked_children = [entry.path for entry in entries if entry.path in tracked]
+        permissions = evaluate_permissions(directory, tracked_children, user_id) if tracked_children else {}
+        for entry in entries:
+            if entry.is_symlink() or entry.name.endswith(".part"):
+                continue
+            if entry.name == TRASH_DIR_NAME and is_trash_path(entry.path):
+                continue
+            relative_path = f"{prefix}{entry.name}"
+            if entry.path in tracked and not permissions[entry.path]["read"]:
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            key = _path_key(relative_path)
+            # Children sort after their folder, so a folder at or before the resume
+            # point may still hold entries that come after it.
+            if resume_key is None or key > resume_key:
+                yield relative_path, entry.path, entry.stat(follow_symlinks=False)
+            if is_dir and (resume_key is None or key > resume_key or resume_key[:len(key)] == key):
+                yield from walk(entry.path, relative_path + "/")
+
+    yield from walk(root, "")
+
+
+def _read_blocks(path: str, size: int):
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining > 0:
+            block = f.read(min(ARCHIVE_BLOCK_SIZE, remaining))
+            if not block:
+                raise IOError(f"{path} shrank while it was being archived")
+            remaining -= len(block)
+            yield block
+
+
+def stream_tar(entries):
+    for relative_path, path, st in entries:
+        info = tarfile.TarInfo(relative_path)
+        info.mtime = int(st.st_mtime)
+        info.mode = stat.S_IMODE(st.st_mode)
+        if stat.S_ISDIR(st.st_mode):
+            info.type = tarfile.DIRTYPE
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+            continue
+        info.size = st.st_size
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        yield from _read_blocks(path, st.st_size)
+        padding = -st.st_size % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink for ZipFile; the generator drains it as it goes."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_zip(entries, compress: bool = False):
+    buffer = _StreamBuffer()
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(buffer, "w", compression=compression, allowZip64=True) as archive:
+        for relative_path, path, st in entries:
+            date_time = time.localtime(max(st.st_mtime, 315532800))[:6]  # zip can't store dates before 1980
+            if stat.S_ISDIR(st.st_mode):
+                info = zipfile.ZipInfo(relative_path + "/", date_time)
+                info.external_attr = (stat.S_IMODE(st.st_mode) | stat.S_IFDIR) << 16
+                archive.writestr(info, b"")
+            else:
+                info = zipfile.ZipInfo(relative_path, date_time)
+                info.compress_type = compression
+                info.external_attr = stat.S_IMODE(st.st_mode) << 16
+                with archive.open(info, "w", force_zip64=st.st_size > zipfile.ZIP64_LIMIT) as dest:
+                    for block in _read_blocks(path, st.st_size):
+                        dest.write(block)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+
+class LRUCache:
+    """
+        Thread-safe, size-bounded LRU map with an optional per-entry TTL (seconds).
+        Counts hits and misses so the admin API can report how well it works.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or time.monotonic() < expires:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item is not None else None
+
+    def pop_prefix(self, prefix: str) -> int:
+        """Drop every string key starting with prefix. Returns how many were removed."""
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def cache_key(path: str) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+# Sorted folder snapshots (utils/listing.py) and get_file_details results, keyed by cache_key.
+listing_cache = LRUCache(Config.LISTING_SNAPSHOT_MAX_DIRS, ttl=Config.LISTING_SNAPSHOT_TTL)
+details_cache = LRUCache(Config.DETAILS_CACHE_SIZE, ttl=Config.DETAILS_CACHE_TTL)
+# can_access_file decisions, keyed by (user_id, file_path, action); see utils/permissions.py.
+permission_cache = LRUCache(Config.PERMISSION_CACHE_SIZE, ttl=Config.PERMISSION_CACHE_TTL)
+
+
+def invalidate_path(path: str, recursive: bool = False):
+    """
+        Forget cached listings and details affected by a change to path: the path itself
+        and every folder above it (their sizes and counts include it), plus everything
+        below it when a folder was removed or moved.
+    """
+    key = cache_key(path)
+    root = cache_key(Config.SHARED_FOLDER)
+    current = key
+    while True:
+        listing_cache.pop(current)
+        details_cache.pop(current)
+        parent = os.path.dirname(current)
+        if current == root or parent == current or not current.startswith(root):
+            break
+        current = parent
+    if recursive:
+        prefix = key.rstrip(os.sep) + os.sep
+        listing_cache.pop_prefix(prefix)
+        details_cache.pop_prefix(prefix)
+
+
+def clear_caches():
+    listing_cache.clear()
+    details_cache.clear()
+
@@ -0,0 +1,56 @@
+import hashlib
+
+try:
+    import blake3
+except ImportError:  # optional dependency
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:  # optional dependency
+    xxhash = None
+
+DEFAULT_ALGORITHM = "sha256"
+
+
+def available_algorithms() -> list:
+    algorithms = ["sha256", "blake2b"]
+    if blake3 is not None:
+        algorithms.append("blake3")
+    if xxhash is not None:
+        algorithms.append("xxh3_128")
+    return algorithms
+
+
+def new_hasher(algorithm: str = DEFAULT_ALGORITHM):
+    """Return an incremental hasher (update()/hexdigest()) for one of available_algorithms()."""
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == "blake3" and blake3 is not None:
+        return blake3.blake3()
+    if algorithm == "xxh3_128" and xxhash is not None:
+        return xxhash.xxh3_128()
+    raise ValueError(
+        f"Unsupported checksum algorithm '{algorithm}'. Available: {', '.join(available_algorithms())}"
+    )
+
+
+def chunked_algorithm(algorithm: str) -> str:
+    """Label for a combine_chunk_checksums value, which is not a plain hash of the file."""
+    return f"{algorithm}-chunks"
+
+
+def combine_chunk_checksums(algorithm: str, chunk_checksums: list) -> str:
+    """
+        Whole-file checksum for a chunked upload: the hash of the raw chunk digests
+        concatenated in chunk order. Built from digests already computed while the
+        chunks streamed in, so the assembled file is never read back. Recomputing it
+        needs the chunk size, so it is stored labelled chunked_algorithm(algorithm)
+        together with that size.
+    """
+    hasher = new_hasher(algorithm)
+    for checksum in chunk_checksums:
+        hasher.update(bytes.fromhex(checksum))
+    return hasher.hexdigest()
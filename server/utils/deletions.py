@@ -0,0 +1,156 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from config import Config
+
+# Where unlink/rmdir relative to an open folder fd are available (Linux, macOS) trees are
+# removed with os.fwalk; elsewhere shutil.rmtree, which reports no progress.
+_FD_RELATIVE = (
+    hasattr(os, "fwalk")
+    and os.unlink in os.supports_dir_fd
+    and os.rmdir in os.supports_dir_fd
+)
+# Deleted items are renamed into this folder at the top of the share (same volume, so the
+# rename is atomic) and removed later by the trash reaper (utils/trash.py).
+TRASH_DIR_NAME = ".trash"
+
+
+def trash_root() -> str:
+    return os.path.join(os.path.normpath(os.path.abspath(Config.SHARED_FOLDER)), TRASH_DIR_NAME)
+
+
+def is_trash_path(path: str) -> bool:
+    """True for the trash folder and anything inside it."""
+    path = os.path.normpath(os.path.abspath(path))
+    root = trash_root()
+    return path == root or path.startswith(root + os.sep)
+
+
+class DeleteJob:
+    """Progress of one recursive delete, reported by the admin API while it runs."""
+
+    def __init__(self, path: str, total_bytes: int = None, iops: int = None):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.total_bytes = total_bytes
+        self.iops = iops
+        self._removed = 0
+        self._paced_since = time.monotonic()
+        self.started = time.time()
+        self.finished = None
+        self.files = 0
+        self.folders = 0
+        self.errors = 0
+        self.last_error = None
+
+    def to_dict(self) -> dict:
+        elapsed = (self.finished or time.time()) - self.started
+        return {
+            "id": self.id,
+            "path": self.path,
+            "total_bytes": self.total_bytes,
+            "files": self.files,
+            "folders": self.folders,
+            "errors": self.errors,
+            "iops": self.iops,
+            "last_error": self.last_error,
+            "elapsed": round(elapsed, 3),
+            "entries_per_second": round((self.files + self.folders) / elapsed) if elapsed > 0 else None,
+        }
+
+
+    def pace(self):
+        """Count one removal, sleeping as needed to stay under self.iops per second."""
+        if not self.iops:
+            return
+        self._removed += 1
+        ahead = self._removed / self.iops - (time.monotonic() - self._paced_since)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+_lock = threading.Lock()
+_active = {}
+_totals = {"completed": 0, "failed": 0, "files": 0, "folders": 0, "errors": 0}
+
+
+def _record_error(job: DeleteJob, error: OSError):
+    job.errors += 1
+    job.last_error = str(error)
+
+
+def _unlink(name: str, dirfd: int, job: DeleteJob):
+    try:
+        os.unlink(name, dir_fd=dirfd)
+        job.files += 1
+        job.pace()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        _record_error(job, e)
+
+
+def _remove_tree_fd(path: str, job: DeleteJob):
+    # Bottom-up, so every folder is empty by the time it is removed. Names are resolved
+    # against the already-open parent fd: no path re-walking per entry, and a folder
+    # swapped for a symlink mid-delete can't redirect us outside the tree.
+    for _, dirnames, filenames, dirfd in os.fwalk(path, topdown=False, onerror=lambda e: _record_error(job, e)):
+        for name in filenames:
+            _unlink(name, dirfd, job)
+        for name in dirnames:
+            try:
+                os.rmdir(name, dir_fd=dirfd)
+                job.folders += 1
+                job.pace()
+            except NotADirectoryError:
+                # fwalk lists symlinks to folders as folders; remove the link, not the target.
+                _unlink(name, dirfd, job)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                _record_error(job, e)
+    try:
+        os.rmdir(path)
+        job.folders += 1
+    except OSError as e:
+        _record_error(job, e)
+
+
+def remove_tree(path: str, total_bytes: int = None, iops: int = None) -> DeleteJob:
+    """
+        Delete a folder and everything in it (or a single file). Blocking; run it on
+        utils.executors.io_pool. With iops, removes at most that many entries per second (not
+        enforced on the shutil.rmtree fallback). Keeps going past entries it can't remove
+        and raises OSError at the end if any were left behind. Running deletes show up in
+        delete_stats().
+    """
+    job = DeleteJob(path, total_bytes, iops)
+    with _lock:
+        _active[job.id] = job
+    try:
+        if os.path.islink(path) or not os.path.isdir(path):
+            # A file, or a link to a folder: remove the link, not what it points at.
+            os.unlink(path)
+            job.files += 1
+        elif _FD_RELATIVE:
+            _remove_tree_fd(path, job)
+        else:
+            shutil.rmtree(path, onerror=lambda _, __, exc_info: _record_error(job, exc_info[1]))
+    finally:
+        job.finished = time.time()
+        with _lock:
+            del _active[job.id]
+            _totals["failed" if job.errors else "completed"] += 1
+            _totals["files"] += job.files
+            _totals["folders"] += job.folders
+            _totals["errors"] += job.errors
+    if job.errors:
+        raise OSError(f"{job.errors} entries under {path} could not be deleted: {job.last_error}")
+    return job
+
+
+def delete_stats() -> dict:
+    with _lock:
+        return {**_totals, "active": [job.to_dict() for job in _active.values()]}
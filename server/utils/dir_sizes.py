@@ -0,0 +1,204 @@
+import asyncio
+import os
+from utils.executors import io_pool
+from config import Config
+from utils.cache import clear_caches
+from utils.utils import get_db_connection, subtree_bounds
+from utils.deletions import is_trash_path, TRASH_DIR_NAME
+
+
+def _key(path: str) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _ancestors(path: str) -> list:
+    """path itself and every folder above it, up to and including the shared root."""
+    root = _key(Config.SHARED_FOLDER)
+    path = _key(path)
+    result = [path]
+    while path != root and path.startswith(root):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+        result.append(path)
+    return result
+
+
+def compute_directory_size(directory: str) -> int:
+    total_size = 0
+    for dirpath, dirnames, filenames in os.walk(directory):
+        # Trashed items no longer count towards the share.
+        if TRASH_DIR_NAME in dirnames and is_trash_path(os.path.join(dirpath, TRASH_DIR_NAME)):
+            dirnames.remove(TRASH_DIR_NAME)
+        for f in filenames:
+            # In-progress uploads are counted when they are committed.
+            if f.endswith(".part"):
+                continue
+            try:
+                total_size += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total_size
+
+
+def get_directory_sizes(directories: list) -> dict:
+    """
+        Recursive size of each folder, from the index. Folders the index doesn't know yet
+        are measured once and stored, so later listings never walk them again.
+    """
+    keys = {directory: _key(directory) for directory in directories}
+    if not keys:
+        return {}
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        known = {}
+        unique_keys = list(set(keys.values()))
+        # Stay well under SQLite's bound-parameter limit.
+        for i in range(0, len(unique_keys), 500):
+            batch = unique_keys[i:i + 500]
+            cursor.execute(
+                f"SELECT path, size FROM directory_sizes WHERE path IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            known.update({row["path"]: row["size"] for row in cursor.fetchall()})
+
+        missing = [key for key in unique_keys if key not in known]
+        if missing:
+            measured = [(key, compute_directory_size(key)) for key in missing]
+            cursor.executemany(
+                "INSERT OR IGNORE INTO directory_sizes (path, size) VALUES (?, ?)", measured
+            )
+            connection.commit()
+            known.update(measured)
+
+        return {directory: known[key] for directory, key in keys.items()}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def get_indexed_directory_size(directory: str) -> int:
+    return get_directory_sizes([directory])[directory]
+
+
+def adjust_directory_size(directory: str, delta: int, cursor=None):
+    """Add delta bytes to directory and all its ancestors in one statement."""
+    if not delta:
+        return
+    ancestors = _ancestors(directory)
+    query = (
+        "UPDATE directory_sizes SET size = size + ?, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE path IN ({','.join('?' * len(ancestors))})"
+    )
+    if cursor is not None:
+        cursor.execute(query, [delta, *ancestors])
+        return
+
+    connection = get_db_connection()
+    try:
+        connection.execute(query, [delta, *ancestors])
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def record_directory(directory: str):
+    """A new, empty folder."""
+    connection = get_db_connection()
+    try:
+        connection.execute(
+            "INSERT OR REPLACE INTO directory_sizes (path, size) VALUES (?, 0)", (_key(directory),)
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def forget_directory_tree(directory: str, cursor=None):
+    """Drop the index rows of a folder and everything below it."""
+    key = _key(directory)
+    low, high = subtree_bounds(key)
+    query = "DELETE FROM directory_sizes WHERE path = ? OR (path > ? AND path < ?)"
+    if cursor is not None:
+        cursor.execute(query, (key, low, high))
+        return
+
+    connection = get_db_connection()
+    try:
+        connection.execute(query, (key, low, high))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def move_directory_tree(old_path: str, new_path: str, size: int, cursor):
+    """
+        Update the index for a moved file or folder of `size` bytes: subtract from the old
+        ancestors, add to the new ones and rewrite the keys of the moved subtree.
+    """
+    old_key, new_key = _key(old_path), _key(new_path)
+    adjust_directory_size(os.path.dirname(old_key), -size, cursor)
+    low, high = subtree_bounds(old_key)
+    cursor.execute(
+        """
+        UPDATE directory_sizes
+        SET path = ? || substr(path, ?)
+        WHERE path = ? OR (path > ? AND path < ?)
+        """,
+        (new_key, len(old_key) + 1, old_key, low, high),
+    )
+    adjust_directory_size(os.path.dirname(new_key), size, cursor)
+
+
+def reconcile_directory_sizes(root: str = None) -> int:
+    """
+        Recompute every folder size under root in one bottom-up walk and replace the
+        index rows. Fixes drift from changes made outside the server.
+        Returns the number of folders indexed.
+    """
+    root = _key(root or Config.SHARED_FOLDER)
+    sizes = {}
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if is_trash_path(dirpath):
+            continue
+        total = 0
+        for f in filenames:
+            if f.endswith(".part"):
+                continue
+            try:
+                total += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+        for d in dirnames:
+            total += sizes.get(os.path.join(dirpath, d), 0)
+        sizes[dirpath] = total
+
+    low, high = subtree_bounds(root)
+    connection = get_db_connection()
+    try:
+        connection.execute(
+            "DELETE FROM directory_sizes WHERE path = ? OR (path > ? AND path < ?)", (root, low, high)
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO directory_sizes (path, size) VALUES (?, ?)", sizes.items()
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    return len(sizes)
+
+
+async def directory_size_reconciler(interval: int):
+    """Background task: reconcile the whole share every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await io_pool.run(reconcile_directory_sizes)
+            # Cached listings carry folder sizes from before the rescan.
+            clear_caches()
+            print(f"Directory size index reconciled ({count} folders)")
+        except Exception as e:
+            print(f"Error reconciling directory sizes: {e}")
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import Config
+
+
+class ExecutorPool:
+    """
+        A named, fixed-size thread pool for one kind of blocking work. Handlers await
+        run() (or are wrapped with offload) so the event loop never blocks on it, and the
+        pool size caps how much of that work runs at once. Counts queued/running tasks
+        and how long tasks waited for a worker, for the admin runtime-stats endpoint.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        # Carry contextvars over like run_in_threadpool does.
+        context = contextvars.copy_context()
+        enqueued = time.monotonic()
+        with self._lock:
+            self.queued += 1
+
+        def task():
+            waited = time.monotonic() - enqueued
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+            self._local.inside = True
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                self._local.inside = False
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        return self._executor.submit(task)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on this pool and await the result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def call(self, fn, *args, **kwargs):
+        """
+            Run fn on this pool from synchronous code (e.g. a handler already on another
+            pool) and wait for it. Runs inline when called from this pool's own workers,
+            which would otherwise deadlock once every worker is waiting.
+        """
+        if getattr(self._local, "inside", False):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def offload(self, handler):
+        """Decorator: turn a blocking route handler into an async one that runs on this pool."""
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            return await self.run(handler, *args, **kwargs)
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "mean_wait_ms": round(self.total_wait / self.completed * 1000, 3) if self.completed else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Disk and filesystem calls (scandir, walks, rename, chunk writes and reads).
+io_pool = ExecutorPool("io", Config.IO_POOL_WORKERS)
+# SQLite queries and the handlers that are mostly queries.
+db_pool = ExecutorPool("db", Config.DB_POOL_WORKERS)
+# CPU-bound work: password hashing and upload checksums.
+cpu_pool = ExecutorPool("cpu", Config.CPU_POOL_WORKERS)
+POOLS = (io_pool, db_pool, cpu_pool)
+
+
+def shutdown_pools():
+    for pool in POOLS:
+        pool.shutdown()
+
+
+class LoopLagMonitor:
+    """
+        How late the event loop wakes up from a sleep of known length. Anything blocking
+        the loop shows up here as lag, whichever handler caused it.
+    """
+
+    def __init__(self, samples: int = 1024):
+        self._samples = deque(maxlen=samples)
+        self.count = 0
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def record(self, lag: float, stalled: bool):
+        self._samples.append(lag)
+        self.count += 1
+        self.max_lag = max(self.max_lag, lag)
+        if stalled:
+            self.stalls += 1
+
+    def stats(self) -> dict:
+        recent = sorted(self._samples)
+        if not recent:
+            return {"enabled": Config.LOOP_LAG_INTERVAL > 0, "samples": 0}
+
+        def percentile(p):
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 3)
+
+        return {
+            "enabled": True,
+            "samples": self.count,
+            "last_ms": round(self._samples[-1] * 1000, 3),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_lag * 1000, 3),
+            "stalls": self.stalls,
+            "stall_threshold_ms": Config.LOOP_LAG_WARN_MS,
+        }
+
+
+loop_lag = LoopLagMonitor()
+
+
+async def monitor_event_loop_lag(interval: float):
+    """Background task: sample event loop lag every `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    threshold = Config.LOOP_LAG_WARN_MS / 1000
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        loop_lag.record(lag, lag >= threshold)
+        if lag >= threshold:
+            print(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+
+def runtime_stats() -> dict:
+    return {
+        "pools": {pool.name: pool.stats() for pool in POOLS},
+        "event_loop": loop_lag.stats(),
+    }
@@ -0,0 +1,143 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+import threading
+from utils.cache import clear_caches, invalidate_path
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+# struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+_EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+class InotifyWatcher:
+    """
+        Linux inotify through ctypes, used to drop cached listings and file details when
+        the share is changed by something other than this server. Folders are watched as
+        they get cached, up to max_watches; past that the caches' TTL still applies.
+    """
+
+    def __init__(self, max_watches: int):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.max_watches = max_watches
+        self._paths = {}
+        self._watches = {}
+        self._lock = threading.Lock()
+        self.events = 0
+        self.overflows = 0
+        self.failed_watches = 0
+
+    def watch(self, directory: str):
+        with self._lock:
+            if directory in self._watches or len(self._watches) >= self.max_watches:
+                return
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                # ENOSPC: fs.inotify.max_user_watches reached; ENOENT: already gone.
+                if ctypes.get_errno() != errno.ENOENT:
+                    self.failed_watches += 1
+                return
+            self._paths[wd] = directory
+            self._watches[directory] = wd
+
+    def read_events(self):
+        """Drain pending events. Registered with the event loop's add_reader."""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            self.events += 1
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so nothing cached can be trusted.
+                self.overflows += 1
+                clear_caches()
+                continue
+            with self._lock:
+                directory = self._paths.get(wd)
+                if mask & IN_IGNORED and directory is not None:
+                    del self._paths[wd]
+                    self._watches.pop(directory, None)
+            if directory is None:
+                continue
+            if not name:
+                invalidate_path(directory, recursive=True)
+                continue
+            name = os.fsdecode(name)
+            # In-progress uploads are hidden from listings; their final rename is reported.
+            if name.endswith(".part"):
+                continue
+            invalidate_path(os.path.join(directory, name), recursive=bool(mask & IN_ISDIR))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "watches": len(self._watches),
+                "max_watches": self.max_watches,
+                "events": self.events,
+                "overflows": self.overflows,
+                "failed_watches": self.failed_watches,
+            }
+
+    def close(self):
+        os.close(self.fd)
+
+
+_watcher = None
+
+
+def start_watcher(max_watches: int):
+    global _watcher
+    if not sys.platform.startswith("linux") or max_watches <= 0:
+        return None
+    try:
+        _watcher = InotifyWatcher(max_watches)
+    except (OSError, AttributeError) as e:
+        print(f"inotify unavailable, cached listings rely on their TTL: {e}")
+        return None
+    return _watcher
+
+
+def stop_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.close()
+        _watcher = None
+
+
+def watch_directory(directory: str):
+    if _watcher is not None:
+        _watcher.watch(directory)
+
+
+def watcher_stats() -> dict:
+    return _watcher.stats() if _watcher is not None else {"enabled": False}
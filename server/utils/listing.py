@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Iterator
+from utils.cache import cache_key, listing_cache
+from utils.file_utils import iter_directory, scan_directory
+from utils.inotify import watch_directory
+from utils.permissions import evaluate_permissions
+
+LISTING_SORT_KEYS = ("name", "size", "mtime")
+LISTING_ORDERS = ("asc", "desc")
+MAX_PAGE_SIZE = 5000
+# Entries joined into one write of a streamed (NDJSON) listing.
+NDJSON_LINES_PER_CHUNK = 256
+
+
+def _sort_key(sort: str):
+    # Name is always the tie breaker so every entry has a unique, stable position.
+    if sort == "size":
+        return lambda entry: (entry.size, entry.name.casefold(), entry.name)
+    if sort == "mtime":
+        return lambda entry: (entry.mtime, entry.name.casefold(), entry.name)
+    return lambda entry: (entry.name.casefold(), entry.name)
+
+
+class DirectorySnapshot:
+    """
+        One scan of a folder, plus each sort order computed on first use. Cached in
+        utils.cache.listing_cache, which expires it after Config.LISTING_SNAPSHOT_TTL
+        (folder sizes and in-place edits don't bump the folder's mtime).
+    """
+
+    def __init__(self, directory: str, mtime_ns: int, entries: list):
+        self.directory = directory
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def ordered(self, sort: str):
+        """(entries, keys) sorted ascending by `sort`."""
+        with self._lock:
+            if sort not in self._orders:
+                key = _sort_key(sort)
+                entries = sorted(self.entries, key=key)
+                self._orders[sort] = (entries, [key(entry) for entry in entries])
+            return self._orders[sort]
+
+
+def get_snapshot(directory: str) -> DirectorySnapshot:
+    key = cache_key(directory)
+    mtime_ns = os.stat(directory).st_mtime_ns
+    snapshot = listing_cache.get(key)
+    if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+        return snapshot
+
+    snapshot = DirectorySnapshot(directory, mtime_ns, scan_directory(directory))
+    listing_cache.set(key, snapshot)
+    watch_directory(key)
+    return snapshot
+
+
+def encode_cursor(sort: str, order: str, key: tuple) -> str:
+    data = json.dumps({"sort": sort, "order": order, "key": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+    """Raises ValueError for a malformed cursor or one issued for another sort/order."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = tuple(data["key"])
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if data.get("sort") != sort or data.get("order") != order:
+        raise ValueError("Cursor was issued for a different sort order")
+    # Same shape as _sort_key's keys, or bisect would compare mismatched types.
+    names = key[-2:]
+    if len(key) != (2 if sort == "name" else 3) or not all(isinstance(name, str) for name in names):
+        raise ValueError("Invalid cursor")
+    if sort != "name" and (isinstance(key[0], bool) or not isinstance(key[0], (int, float))):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _matcher(prefix: str = None, extensions: list = None):
+    prefix = prefix.casefold() if prefix else None
+    suffixes = tuple(
+        ext if ext.startswith(".") else f".{ext}"
+        for ext in (e.strip().lower() for e in extensions or [])
+        if ext
+    )
+    if not prefix and not suffixes:
+        return None
+
+    def matches(entry) -> bool:
+        name = entry.name.casefold()
+        if prefix and not name.startswith(prefix):
+            return False
+        return not suffixes or name.endswith(suffixes)
+
+    return matches
+
+
+def list_directory_page(
+    directory: str,
+    sort: str = "name",
+    order: str = "asc",
+    prefix: str = None,
+    extensions: list = None,
+    cursor: str = None,
+    limit: int = None,
+) -> dict:
+    """
+        Sorted, filtered listing of directory from its snapshot. With a limit, returns at
+        most `limit` entries after `cursor` and a next_cursor for the following page.
+        Cursors hold the sort key of the last entry returned rather than an offset, so
+        pages stay consistent when the folder changes (and the snapshot is rebuilt)
+        between requests. Raises ValueError for a bad sort, order or cursor.
+    """
+    if sort not in LISTING_SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(LISTING_SORT_KEYS)}")
+    if order not in LISTING_ORDERS:
+        raise ValueError(f"order must be one of {', '.join(LISTING_ORDERS)}")
+
+    entries, keys = get_snapshot(directory).ordered(sort)
+    descending = order == "desc"
+    if cursor:
+        after = decode_cursor(cursor, sort, order)
+        start = bisect_left(keys, after) - 1 if descending else bisect_right(keys, after)
+    else:
+        start = len(entries) - 1 if descending else 0
+    positions = range(start, -1, -1) if descending else range(start, len(entries))
+
+    matches = _matcher(prefix, extensions)
+    if matches is None:
+        total = len(entries)
+    else:
+        total = sum(1 for entry in entries if matches(entry))
+
+    page = []
+    last = None
+    for i in positions:
+        entry = entries[i]
+        if matches is not None and not matches(entry):
+            continue
+        if limit is not None and len(page) == limit:
+            return {
+                "entries": page,
+                "next_cursor": encode_cursor(sort, order, keys[last]),
+                "total": total,
+            }
+        page.append(entry)
+        last = i
+    return {"entries": page, "next_cursor": None, "total": total}
+
+
+def entries_to_dicts(directory: str, entries: list, user_id: int) -> list:
+    """Entry dicts with the user's capability flags under "permissions"."""
+    permissions = evaluate_permissions(directory, [entry.path for entry in entries], user_id)
+    return [{**entry.to_dict(), "permissions": permissions[entry.path]} for entry in entries]
+
+
+def iter_ndjson(directory: str, user_id: int, prefix: str = None, extensions: list = None) -> Iterator[bytes]:
+    """
+        Stream a folder as newline-delimited JSON, one entry per line in os.scandir order.
+        Nothing is sorted or collected, so time to first byte and memory use don't depend
+        on the folder size. If the scan fails part way, the last line is {"error": ...}.
+    """
+    matches = _matcher(prefix, extensions)
+    batch = []
+    try:
+        for entry in iter_directory(directory):
+            if matches is not None and not matches(entry):
+                continue
+            batch.append(entry)
+            if len(batch) >= NDJSON_LINES_PER_CHUNK:
+                yield _ndjson_lines(entries_to_dicts(directory, batch, user_id))
+                batch = []
+        if batch:
+            yield _ndjson_lines(entries_to_dicts(directory, batch, user_id))
+    except OSError as e:
+        print(f"Error streaming listing of {directory}: {e}")
+        yield _ndjson_lines([{"error": "Listing was interrupted"}])
+
+
+def _ndjson_lines(items: list) -> bytes:
+    return "".join(json.dumps(item) + "\n" for item in items).encode()
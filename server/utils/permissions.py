@@ -1,27 +1,368 @@
 from typing import Optional
-from utils.utils import get_db_connection
+from utils.utils import (
+    get_db_connection,
+    subtree_bounds,
+    permission_mask,
+    ACTION_BITS,
+    PERMISSION_READ,
+    PERMISSION_WRITE,
+    PERMISSION_EXECUTE,
+    PERMISSION_DELETE,
+    PERMISSION_MODIFY,
+    PERMISSION_FULL_CONTROL,
+)
+from utils.cache import permission_cache
 from config import Config
 import os
+import threading
 
 
 
-def get_parent_file(cursor, file_path: str):
-    arr = file_path.split("\\")[:-1]
-    path = "{}".format("\\".join(arr))    
+# Longest parent_id chain followed when resolving inherited permissions; also stops
+# a corrupted (cyclic) chain.
+MAX_INHERITANCE_DEPTH = 256
+
+
+def _ancestor_paths(file_path: str) -> list:
+    """Folders above file_path, nearest first, up to and including the shared folder."""
+    root = os.path.abspath(Config.SHARED_FOLDER)
+    path = os.path.abspath(file_path)
+    ancestors = []
+    while path != root and path.startswith(root):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+        ancestors.append(path)
+    if ancestors and ancestors[-1] == root and Config.SHARED_FOLDER != root:
+        # The shared folder's own row is stored under the configured (maybe relative) path.
+        ancestors.append(Config.SHARED_FOLDER)
+    return ancestors
+
+
+def get_parent_file(cursor, file_path: str) -> Optional[int]:
+    """
+        id of the nearest tracked folder above file_path (usually its direct parent),
+        or None when there is none, e.g. for the shared folder itself.
+    """
+    ancestors = _ancestor_paths(file_path)
+    if not ancestors:
+        return None
+    cursor.execute(
+        f"""
+        SELECT id
+        FROM files
+        WHERE file_path IN ({','.join('?' * len(ancestors))})
+        ORDER BY length(file_path) DESC
+        LIMIT 1
+        """,
+        ancestors,
+    )
+    result = cursor.fetchone()
+    return result["id"] if result else None
+
+
+def _chain_masks(cursor, file_ids: list, user_id: int) -> dict:
+    """
+        {file_id: OR of the permission masks of every group the user shares with the file
+        or any of its ancestors}, following parent_id in one recursive query per 500 ids.
+    """
+    masks = dict.fromkeys(file_ids, 0)
+    for i in range(0, len(file_ids), 500):
+        batch = file_ids[i:i + 500]
+        cursor.execute(
+            f"""
+            WITH RECURSIVE chain(seed, id, depth) AS (
+                SELECT id, id, 0 FROM files WHERE id IN ({','.join('?' * len(batch))})
+                UNION ALL
+                SELECT chain.seed, f.parent_id, chain.depth + 1
+                FROM chain
+                JOIN files f ON f.id = chain.id
+                -- The shared folder's row may point at itself.
+                WHERE f.parent_id IS NOT NULL AND f.parent_id != f.id AND chain.depth < ?
+            )
+            SELECT chain.seed, BIT_OR(gp.permission_mask) AS mask
+            FROM chain
+            JOIN file_groups fg ON fg.file_id = chain.id
+            JOIN user_groups ug ON ug.group_id = fg.group_id AND ug.user_id = ?
+            JOIN group_permissions gp ON gp.group_id = fg.group_id
+            GROUP BY chain.seed
+            """,
+            [*batch, MAX_INHERITANCE_DEPTH, user_id],
+        )
+        for row in cursor.fetchall():
+            masks[row["seed"]] = row["mask"] or 0
+    return masks
+
+
+def repair_parent_ids() -> int:
+    """
+        Recompute files.parent_id from the stored paths. Older versions derived it by
+        splitting on backslashes, which pointed every row at id 1 outside Windows.
+        Returns the number of rows fixed.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
     try:
+        cursor.execute("SELECT id, file_path, parent_id FROM files")
+        rows = cursor.fetchall()
+        ids = {row["file_path"]: row["id"] for row in rows}
+        updates = []
+        for row in rows:
+            parent_id = next((ids[a] for a in _ancestor_paths(row["file_path"]) if a in ids), None)
+            if parent_id != row["parent_id"]:
+                updates.append((parent_id, row["id"]))
+        cursor.executemany("UPDATE files SET parent_id = ? WHERE id = ?", updates)
+        connection.commit()
+        return len(updates)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def unlink_file_ancestors(cursor, file_ids: list):
+    """Drop every closure row that mentions the given files."""
+    for i in range(0, len(file_ids), 500):
+        batch = file_ids[i:i + 500]
+        placeholders = ",".join("?" * len(batch))
+        cursor.execute(
+            f"DELETE FROM file_ancestors WHERE descendant_id IN ({placeholders}) OR ancestor_id IN ({placeholders})",
+            [*batch, *batch],
+        )
+
+
+def relink_file_ancestors(cursor, file_id: int, new_parent_id: Optional[int]):
+    """
+        Move the subtree rooted at file_id under new_parent_id: cut the links between the
+        subtree and its old ancestors, then join every new ancestor to every subtree
+        member. Also updates the subtree root's parent_id.
+    """
+    cursor.execute(
+        """
+        DELETE FROM file_ancestors
+        WHERE descendant_id IN (SELECT descendant_id FROM file_ancestors WHERE ancestor_id = :id)
+          AND ancestor_id NOT IN (SELECT descendant_id FROM file_ancestors WHERE ancestor_id = :id)
+        """,
+        {"id": file_id},
+    )
+    if new_parent_id is not None:
         cursor.execute(
             """
-            SELECT id
-            FROM files
-            WHERE file_path = ?
+            INSERT OR IGNORE INTO file_ancestors (ancestor_id, descendant_id, depth)
+            SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+            FROM file_ancestors above
+            JOIN file_ancestors below ON below.ancestor_id = ?
+            WHERE above.descendant_id = ?
             """,
-            (path,),
+            (file_id, new_parent_id),
         )
-        result = cursor.fetchone()
-        return result["id"] 
-    except Exception as e:
-        return 1
+    cursor.execute("UPDATE files SET parent_id = ? WHERE id = ?", (new_parent_id, file_id))
+
+
+def delete_file_rows(cursor, file_path: str) -> int:
+    """
+        Remove the rows of a file or folder and everything below it: closure links, group
+        memberships and the files rows themselves, one range delete over the file_path
+        index per table. Returns the number of files rows removed. Runs in the caller's
+        transaction.
+    """
+    low, high = subtree_bounds(file_path)
+    subtree = "SELECT id FROM files WHERE file_path = ? OR (file_path > ? AND file_path < ?)"
+    params = (file_path, low, high)
+    # Every link touching the subtree has a descendant inside it.
+    cursor.execute(f"DELETE FROM file_ancestors WHERE descendant_id IN ({subtree})", params)
+    cursor.execute(f"DELETE FROM file_groups WHERE file_id IN ({subtree})", params)
+    cursor.execute("DELETE FROM files WHERE file_path = ? OR (file_path > ? AND file_path < ?)", params)
+    return cursor.rowcount
+
+
+def purge_file_rows(file_path: str, batch_size: int) -> int:
+    """
+        delete_file_rows in transactions of at most batch_size files, so purging a huge
+        tree never holds the write lock for long. Returns the number of files rows removed.
+    """
+    low, high = subtree_bounds(file_path)
+    removed = 0
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(
+                "SELECT id FROM files WHERE file_path = ? OR (file_path > ? AND file_path < ?) LIMIT ?",
+                (file_path, low, high, batch_size),
+            )
+            file_ids = [row["id"] for row in cursor.fetchall()]
+            if not file_ids:
+                return removed
+            unlink_file_ancestors(cursor, file_ids)
+            for i in range(0, len(file_ids), 500):
+                batch = file_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor.execute(f"DELETE FROM file_groups WHERE file_id IN ({placeholders})", batch)
+                cursor.execute(f"DELETE FROM files WHERE id IN ({placeholders})", batch)
+            connection.commit()
+            removed += len(file_ids)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def move_file_rows(cursor, old_path: str, new_path: str) -> int:
+    """
+        Point the rows of a moved file or folder, and everything below it, at new_path:
+        one prefix UPDATE over the file_path index, then relink the subtree under its new
+        parent. Stale rows already at the destination (it didn't exist on disk, or the
+        move would have failed) are removed first so the rewrite can't collide.
+        When the moved root itself isn't tracked, each tracked row whose parent is
+        outside the subtree is relinked instead.
+        Returns the number of rows moved. Runs in the caller's transaction.
+    """
+    delete_file_rows(cursor, new_path)
+
+    low, high = subtree_bounds(old_path)
+    cursor.execute(
+        """
+        UPDATE files
+        SET file_path = ? || substr(file_path, ?)
+        WHERE file_path = ? OR (file_path > ? AND file_path < ?)
+        """,
+        (new_path, len(old_path) + 1, old_path, low, high),
+    )
+    moved = cursor.rowcount
+
+    low, high = subtree_bounds(new_path)
+    cursor.execute(
+        """
+        SELECT f.id, f.file_path
+        FROM files f
+        WHERE (f.file_path = :path OR (f.file_path > :low AND f.file_path < :high))
+          AND NOT EXISTS (
+              SELECT 1 FROM files p
+              WHERE p.id = f.parent_id
+                AND (p.file_path = :path OR (p.file_path > :low AND p.file_path < :high))
+          )
+        """,
+        {"path": new_path, "low": low, "high": high},
+    )
+    for row in cursor.fetchall():
+        relink_file_ancestors(cursor, row["id"], get_parent_file(cursor, row["file_path"]))
+    return moved
+
+
+def rebuild_file_ancestors() -> int:
+    """
+        Rebuild the whole closure table from files.parent_id with one recursive query.
+        Returns the number of closure rows.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM file_ancestors")
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO file_ancestors (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE chain(ancestor_id, descendant_id, depth) AS (
+                SELECT id, id, 0 FROM files
+                UNION ALL
+                SELECT f.parent_id, chain.descendant_id, chain.depth + 1
+                FROM chain
+                JOIN files f ON f.id = chain.ancestor_id
+                WHERE f.parent_id IS NOT NULL AND f.parent_id != f.id AND chain.depth < ?
+            )
+            SELECT ancestor_id, descendant_id, MIN(depth) FROM chain GROUP BY ancestor_id, descendant_id
+            """,
+            (MAX_INHERITANCE_DEPTH,),
+        )
+        connection.commit()
+        cursor.execute("SELECT COUNT(*) AS count FROM file_ancestors")
+        return cursor.fetchone()["count"]
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def file_ancestors_complete() -> bool:
+    """True when every file has its depth-0 closure row."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT 1 FROM files f
+            WHERE NOT EXISTS (
+                SELECT 1 FROM file_ancestors fa WHERE fa.ancestor_id = f.id AND fa.descendant_id = f.id
+            )
+            LIMIT 1
+            """
+        )
+        return cursor.fetchone() is None
+    finally:
+        cursor.close()
+        connection.close()
+
 
+def get_subtree(file_path: str, group_id: Optional[int] = None, action: Optional[str] = None) -> list:
+    """
+        Tracked files strictly below file_path as rows of (id, file_path, depth). With
+        group_id and action, only those the group may perform action on, directly or
+        through any ancestor. Both filters are index lookups on file_ancestors.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        query = """
+            SELECT f.id, f.file_path, fa.depth
+            FROM files root
+            JOIN file_ancestors fa ON fa.ancestor_id = root.id AND fa.depth > 0
+            JOIN files f ON f.id = fa.descendant_id
+            WHERE root.file_path = :path
+        """
+        params = {"path": file_path}
+        if group_id is not None:
+            query += """
+              AND EXISTS (
+                SELECT 1
+                FROM file_ancestors up
+                JOIN file_groups fg ON fg.file_id = up.ancestor_id AND fg.group_id = :group_id
+                JOIN group_permissions gp ON gp.group_id = fg.group_id
+                WHERE up.descendant_id = f.id AND gp.permission_mask & :bit
+              )
+            """
+            params.update({"group_id": group_id, "bit": ACTION_BITS.get(action, 0) if action else -1})
+        cursor.execute(query + " ORDER BY fa.depth, f.file_path", params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def is_file_tracked(file_path: str) -> bool:
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM files WHERE file_path = ?", (file_path,))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+_permissions_version = 0
+_version_lock = threading.Lock()
+
+
+def bump_permissions_version():
+    """
+        Call after committing a change to files, file_groups, group_permissions or
+        user_groups: every cached access decision becomes stale at once.
+    """
+    global _permissions_version
+    with _version_lock:
+        _permissions_version += 1
+
+
+def permissions_version() -> int:
+    return _permissions_version
 
 
 def can_access_file(file_path: str, user_id: int, action: str) -> bool:
@@ -31,14 +372,31 @@ def can_access_file(file_path: str, user_id: int, action: str) -> bool:
         File Ownership: owner of the file, they automatically have full control over the file.
         Group Permissions:the user's group memberships are checked to determine if they inherit any permissions from the groups they belong to.
         File-Level Permissions:The permissions assigned to the file's associated groups are checked first. If the user belongs to a group that has the required permission, access is granted.
-        Parent Folder Permissions:If no permissions are found at the file level, the function checks the permissions of the parent folder. If the user inherits the required permission from the parent folder, access is granted.
-        Permission Hierarchy:Permissions are evaluated in a hierarchical manner (e.g., Full Control includes all permissions, Modify includes Read, Write, etc.).    
+        Inherited Permissions:If no permissions are found at the file level, the permissions of every folder above it are checked (the whole parent_id chain, in one recursive query). If the user inherits the required permission from any of them, access is granted.
+        Permission Hierarchy:Permissions are evaluated in a hierarchical manner (e.g., Full Control includes all permissions, Modify includes Read, Write, etc.).
+        Decisions are cached per (user, path, action) until the next bump_permissions_version().
     """
     
     if file_path == Config.SHARED_FOLDER and action == "Read":
         return True
-    
-    
+
+    key = (user_id, file_path, action)
+    version = _permissions_version
+    cached = permission_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    try:
+        allowed = _check_access(file_path, user_id, action)
+    except Exception as e:
+        # Not cached: the next request retries the lookup.
+        print(f"Error checking file access: {e}")
+        return False
+    permission_cache.set(key, (version, allowed))
+    return allowed
+
+
+def _check_access(file_path: str, user_id: int, action: str) -> bool:
     connection = get_db_connection()
     cursor = connection.cursor()  
 
@@ -58,158 +416,202 @@ def can_access_file(file_path: str, user_id: int, action: str) -> bool:
         if file is None:
             return False
 
-        file_id, owner_id, parent_id = file['id'], file['owner_id'], file['parent_id']
+        file_id, owner_id = file['id'], file['owner_id']
 
         # If the user is the owner, they have full control
         if user_id == owner_id:
             return True
 
-        # Get the user's groups
-        cursor.execute(
-            """
-            SELECT group_id
-            FROM user_groups
-            WHERE user_id = ?
-            """,
-            (user_id,),
-        )
-        user_groups = [row['group_id'] for row in cursor.fetchall()]
+        mask = _chain_masks(cursor, [file_id], user_id)[file_id]
+        return bool(mask & ACTION_BITS.get(action, 0))
 
-        # Get permissions for the file's groups
-        cursor.execute(
-            """
-            SELECT group_id, permission
-            FROM group_permissions
-            WHERE group_id IN (
-                SELECT group_id
-                FROM file_groups
-                WHERE file_id = ?
-            )
-            """,
-            (file_id,),
-        )
-        file_permissions = cursor.fetchall()
-     
-        # Check if the user has the required permission through file groups
-        for perm in file_permissions:
-            if perm['group_id'] in user_groups:
-                if _has_permission(perm['permission'], action):
-                    return True
-
-        if parent_id:
-            cursor.execute(
-                """
-                SELECT group_id, permission
-                FROM group_permissions
-                WHERE group_id IN (
-                    SELECT group_id
-                    FROM file_groups
-                    WHERE file_id = ?
-                )
-                """,
-                (parent_id,),
-            )
-            parent_permissions = cursor.fetchall()
-         
-            # Check if the user has the required permission through parent folder groups
-            for perm in parent_permissions:
-                if perm['group_id'] in user_groups:
-                    if _has_permission(perm['permission'], action):
-                        return True
+    finally:
+        cursor.close()
+        connection.close()
 
-        return False
 
-    except Exception as e:
-        print(f"Error checking file access: {e}")
-        return False
+# Capability flags returned by evaluate_permissions, mapped to the bit each one needs.
+CAPABILITY_BITS = {
+    "read": PERMISSION_READ,
+    "write": PERMISSION_WRITE,
+    "execute": PERMISSION_EXECUTE,
+    "delete": PERMISSION_DELETE,
+    "modify": PERMISSION_MODIFY,
+    "full_control": PERMISSION_FULL_CONTROL,
+}
+
+# Each file's owner, parent and the OR of the user's group masks on the file itself;
+# what it inherits comes from _chain_masks on the (few, distinct) parents.
+_BATCH_PERMISSIONS_QUERY = """
+    SELECT f.file_path, f.owner_id, f.parent_id, BIT_OR(gp.permission_mask) AS mask
+    FROM files f
+    LEFT JOIN file_groups fg ON fg.file_id = f.id
+    LEFT JOIN user_groups ug ON ug.group_id = fg.group_id AND ug.user_id = :user_id
+    LEFT JOIN group_permissions gp ON gp.group_id = ug.group_id
+    WHERE {where}
+    GROUP BY f.id
+"""
+
+
+def evaluate_permissions(directory: str, paths: list, user_id: int) -> dict:
+    """
+        Capability flags ({"read": bool, ...}, see CAPABILITY_BITS) for each path, all
+        direct children of directory, from two set-based queries (the children, then
+        their parents' ancestor chains) instead of one can_access_file call per child. Untracked paths get every flag False, as
+        can_access_file would.
+    """
+    masks = dict.fromkeys(paths, 0)
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        if len(paths) <= 500:
+            params = {"user_id": user_id}
+            params.update({f"p{i}": path for i, path in enumerate(paths)})
+            placeholders = ",".join(f":p{i}" for i in range(len(paths)))
+            where = f"f.file_path IN ({placeholders})"
+        else:
+            # A whole folder: one index range scan over its subtree, direct children only.
+            low, high = subtree_bounds(directory)
+            params = {"user_id": user_id, "low": low, "high": high, "name_start": len(low) + 1, "sep": os.sep}
+            where = (
+                "f.file_path > :low AND f.file_path < :high "
+                "AND instr(substr(f.file_path, :name_start), :sep) = 0"
+            )
+        if paths:
+            cursor.execute(_BATCH_PERMISSIONS_QUERY.format(where=where), params)
+            rows = [row for row in cursor.fetchall() if row["file_path"] in masks]
+            parent_ids = list({row["parent_id"] for row in rows if row["parent_id"] is not None})
+            inherited = _chain_masks(cursor, parent_ids, user_id)
+            for row in rows:
+                if row["owner_id"] == user_id:
+                    # The owner has full control.
+                    masks[row["file_path"]] = -1
+                else:
+                    masks[row["file_path"]] = (row["mask"] or 0) | inherited.get(row["parent_id"], 0)
     finally:
         cursor.close()
         connection.close()
 
+    return {
+        path: {flag: bool(mask & bit) for flag, bit in CAPABILITY_BITS.items()}
+        for path, mask in masks.items()
+    }
+
 
 def _has_permission(assigned_permission: str, required_action: str) -> bool:
+    return bool(permission_mask(assigned_permission) & ACTION_BITS.get(required_action, 0))
 
-    permission_hierarchy = {
-        'Full Control': ['Full Control', 'Modify', 'Read & Execute', 'Read', 'Write', 'Delete'],
-        'Modify': ['Modify', 'Read & Execute', 'Read', 'Write', 'Delete'],
-        'Read & Execute': ['Read & Execute', 'Read'],
-        'Read': ['Read'],
-        'Write': ['Write'],
-        'Delete': ['Delete']
-    }
+# Groups given to a new file whose parent has none (or that has no tracked parent).
+DEFAULT_GROUP_IDS = (1, 2, 3)
 
-    # Check if the required action is allowed by the assigned permission
-    if required_action in permission_hierarchy.get(assigned_permission, []):
-        return True
-    return False
 
-def add_file_permissions(
-    file_path: str,
-    owner_id: int,
-    parent_id: Optional[int] = None,
-):
-    
+def register_files(file_paths: list, owner_id: int) -> int:
+    """
+        Track many new files and folders in one transaction. Paths are registered
+        shallowest first, so a folder and its contents can come in the same call; each
+        depth level is one executemany into a temp table, then set-based INSERT ... SELECT
+        statements add the files rows, inherit the parent's groups (DEFAULT_GROUP_IDS when
+        the parent has none) and link the closure table. Paths that are already tracked
+        are left untouched. Returns the number of files registered.
+    """
+    levels = {}
+    for path in dict.fromkeys(file_paths):
+        levels.setdefault(path.count(os.sep), []).append(path)
+    if not levels:
+        return 0
+
     connection = get_db_connection()
     cursor = connection.cursor()
-    parent_id = get_parent_file(cursor, file_path)
-    try:    
-
+    try:
         cursor.execute(
-            """
-            INSERT INTO files (file_path, owner_id, parent_id)
-            VALUES (?, ?, ?)
-            """,
-            (file_path, owner_id, parent_id),
+            "CREATE TEMP TABLE IF NOT EXISTS new_files (file_path VARCHAR(1024) PRIMARY KEY, parent_id INTEGER)"
         )
-        file_id = cursor.lastrowid 
+        # Ids of the tracked folders the new paths can hang from, fetched once.
+        candidates = list({a for path in dict.fromkeys(file_paths) for a in _ancestor_paths(path)})
+        known = {}
+        for i in range(0, len(candidates), 500):
+            batch = candidates[i:i + 500]
+            cursor.execute(
+                f"SELECT id, file_path FROM files WHERE file_path IN ({','.join('?' * len(batch))})", batch
+            )
+            known.update({row["file_path"]: row["id"] for row in cursor.fetchall()})
 
-        default_group_ids = [1, 2, 3]  
-        if parent_id:
+        registered = 0
+        for depth in sorted(levels):
+            paths = levels[depth]
+            cursor.execute("DELETE FROM new_files")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO new_files (file_path, parent_id) VALUES (?, ?)",
+                [
+                    (path, next((known[a] for a in _ancestor_paths(path) if a in known), None))
+                    for path in paths
+                ],
+            )
+            cursor.execute("DELETE FROM new_files WHERE file_path IN (SELECT file_path FROM files)")
+            cursor.execute(
+                "INSERT INTO files (file_path, owner_id, parent_id) SELECT file_path, ?, parent_id FROM new_files",
+                (owner_id,),
+            )
+            registered += cursor.rowcount
             cursor.execute(
                 """
-                SELECT group_id
-                FROM file_groups
-                WHERE file_id = ?
+                INSERT OR IGNORE INTO file_groups (file_id, group_id)
+                SELECT f.id, pg.group_id
+                FROM new_files n
+                JOIN files f ON f.file_path = n.file_path
+                JOIN file_groups pg ON pg.file_id = n.parent_id
+                """
+            )
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO file_groups (file_id, group_id)
+                SELECT f.id, g.id
+                FROM new_files n
+                JOIN files f ON f.file_path = n.file_path
+                JOIN groups g ON g.id IN ({','.join('?' * len(DEFAULT_GROUP_IDS))})
+                WHERE NOT EXISTS (SELECT 1 FROM file_groups pg WHERE pg.file_id = n.parent_id)
                 """,
-                (parent_id,),
+                DEFAULT_GROUP_IDS,
             )
-            parent_groups = cursor.fetchall()
-
-            if parent_groups:
-                for group in parent_groups:
-                    cursor.execute(
-                        """
-                        INSERT INTO file_groups (file_id, group_id)
-                        VALUES (?, ?)
-                        """,
-                        (file_id, group["group_id"]),
-                    )
-            else:
-                for group_id in default_group_ids:
-                    cursor.execute(
-                        """
-                        INSERT INTO file_groups (file_id, group_id)
-                        VALUES (?, ?)
-                        """,
-                        (file_id, group_id),
-                    )
-        else:
-            for group_id in default_group_ids:
-                cursor.execute(
-                    """
-                    INSERT INTO file_groups (file_id, group_id)
-                    VALUES (?, ?)
-                    """,
-                    (file_id, group_id),
-                )
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO file_ancestors (ancestor_id, descendant_id, depth)
+                SELECT f.id, f.id, 0
+                FROM new_files n
+                JOIN files f ON f.file_path = n.file_path
+                UNION ALL
+                SELECT fa.ancestor_id, f.id, fa.depth + 1
+                FROM new_files n
+                JOIN files f ON f.file_path = n.file_path
+                JOIN file_ancestors fa ON fa.descendant_id = n.parent_id
+                """
+            )
+            # Deeper levels may hang from the folders just added.
+            cursor.execute("SELECT f.id, f.file_path FROM new_files n JOIN files f ON f.file_path = n.file_path")
+            known.update({row["file_path"]: row["id"] for row in cursor.fetchall()})
 
+        cursor.execute("DELETE FROM new_files")
         connection.commit()
+        if registered:
+            bump_permissions_version()
+        return registered
     except Exception as e:
-        connection.rollback();
-        print(f"Error adding file permissions: {e}")
-        raise   
+        connection.rollback()
+        print(f"Error registering files: {e}")
+        raise
     finally:
+        cursor.close()
         connection.close()
 
 
+def add_file_permissions(
+    file_path: str,
+    owner_id: int,
+    parent_id: Optional[int] = None,
+):
+    """Track one new file; see register_files. parent_id is resolved from the path."""
+    register_files([file_path], owner_id)
+
+
 
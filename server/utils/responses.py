@@ -0,0 +1,243 @@
+import hashlib
+import os
+import secrets
+import time
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+from utils.executors import io_pool
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from config import Config
+
+# How much data one block should hold, in seconds of the client's observed drain rate.
+TARGET_BLOCK_SECONDS = 0.05
+# Range headers listing more parts than this are ignored and the whole file is sent.
+MAX_RANGES = 50
+# Out-of-order requests for several ranges averaging less than this are ignored too.
+SMALL_RANGE_BYTES = 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def read_at(file, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(file.fileno(), size, offset)
+    # Windows: no pread, but the file object belongs to this response alone.
+    file.seek(offset)
+    return file.read(size)
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    token = f"{stat_result.st_mtime_ns}-{stat_result.st_size}"
+    return f'"{hashlib.md5(token.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+        Parse `bytes=a-b, c-, -n` into sorted, merged (start, end) pairs with inclusive ends.
+        Returns None for a header we should ignore (wrong unit or bad syntax, per RFC 9110),
+        raises RangeNotSatisfiable when no range overlaps the file. Also ignores headers
+        that would be expensive to serve (RFC 9110 §14.2): more than MAX_RANGES parts,
+        more than two overlapping ranges, or many small ranges out of order.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    if spec.count(",") >= MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                # Suffix range: the last N bytes.
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(0, file_size - suffix), file_size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else file_size - 1
+                if last and end < start:
+                    return None
+                end = min(end, file_size - 1)
+        except ValueError:
+            return None
+        if start < file_size and start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable(range_header)
+
+    if len(ranges) > 2 and ranges != sorted(ranges):
+        if sum(end - start + 1 for start, end in ranges) / len(ranges) < SMALL_RANGE_BYTES:
+            return None
+    ranges.sort()
+    overlapping = 0
+    furthest = -1
+    for start, end in ranges:
+        if start <= furthest:
+            overlapping += 1
+        furthest = max(furthest, end)
+    if overlapping > 1:
+        return None
+
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class AdaptiveBlockSize:
+    """
+        Picks the read size for the pread fallback. It starts at 1/16 of the range so
+        small ranges finish in a few threadpool round trips, then tracks how fast the
+        client drains data: when send() returns immediately the block doubles toward
+        max_size, and when the client is slow it shrinks to ~TARGET_BLOCK_SECONDS worth
+        of data so a slow connection doesn't pin megabytes of buffer.
+    """
+
+    def __init__(self, length: int, min_size: int, max_size: int):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.size = self._clamp(length // 16)
+        self.drain_rate = None
+
+    def _clamp(self, size: int) -> int:
+        return max(self.min_size, min(self.max_size, size))
+
+    def observe(self, sent_bytes: int, send_seconds: float):
+        if send_seconds <= 0:
+            self.size = self._clamp(self.size * 2)
+            return
+        rate = sent_bytes / send_seconds
+        self.drain_rate = rate if self.drain_rate is None else 0.7 * self.drain_rate + 0.3 * rate
+        # Grow at most 2x per step so one fast send doesn't jump straight to max_size.
+        self.size = self._clamp(min(self.size * 2, int(self.drain_rate * TARGET_BLOCK_SECONDS)))
+
+
+class RangeFileResponse(Response):
+    """
+        Serves a file with full Range support: single, suffix (bytes=-N) and multi-range
+        (multipart/byteranges) requests, validated with ETag / If-Range.
+        Bytes go out through the ASGI `http.response.zerocopysend` extension (sendfile)
+        when the server provides it, otherwise through os.pread in the threadpool with
+        an AdaptiveBlockSize read size.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        request_headers: Headers,
+        filename: str,
+        stat_result: Optional[os.stat_result] = None,
+        media_type: str = "application/octet-stream",
+        method: str = "GET",
+        min_block_size: int = Config.DOWNLOAD_MIN_BLOCK_SIZE,
+        max_block_size: int = Config.DOWNLOAD_MAX_BLOCK_SIZE,
+    ):
+        super().__init__(media_type=media_type)
+        self.path = path
+        self.min_block_size = min_block_size
+        self.max_block_size = max_block_size
+        self.stat_result = stat_result or os.stat(path)
+        self.file_size = self.stat_result.st_size
+        self.send_header_only = method.upper() == "HEAD"
+        self.boundary = None
+
+        etag = make_etag(self.stat_result)
+        last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+        self.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        self.headers["Accept-Ranges"] = "bytes"
+        self.headers["ETag"] = etag
+        self.headers["Last-Modified"] = last_modified
+
+        self.ranges = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        # If-Range: only honour the Range when the client's validator still matches,
+        # otherwise send the whole (changed) file.
+        if range_header and (if_range is None or if_range in (etag, last_modified)):
+            self.ranges = parse_range_header(range_header, self.file_size)
+
+        if self.ranges is None:
+            self.status_code = 200
+            self.headers["Content-Length"] = str(self.file_size)
+        elif len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = 206
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{self.file_size}"
+            self.headers["Content-Length"] = str(end - start + 1)
+        else:
+            self.status_code = 206
+            self.boundary = secrets.token_hex(13)
+            self.headers["Content-Type"] = f"multipart/byteranges; boundary={self.boundary}"
+            self.headers["Content-Length"] = str(
+                sum(len(self._part_header(s, e)) + (e - s + 1) for s, e in self.ranges)
+                + len(self._closing_boundary())
+            )
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"\r\n--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _closing_boundary(self) -> bytes:
+        return f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+
+    async def _send_segment(self, send, file, zerocopy: bool, start: int, count: int, more_body: bool):
+        if zerocopy:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": file,
+                "offset": start,
+                "count": count,
+                "more_body": more_body,
+            })
+            return
+
+        end = start + count
+        block_size = AdaptiveBlockSize(count, self.min_block_size, self.max_block_size)
+        while start < end:
+            block = await io_pool.run(read_at, file, min(block_size.size, end - start), start)
+            if not block:
+                raise IOError(f"{self.path} shrank while it was being sent")
+            start += len(block)
+            # send() only returns once the server has room for more, so its duration
+            # reflects how fast the client is draining the connection.
+            started = time.perf_counter()
+            await send({"type": "http.response.body", "body": block, "more_body": more_body or start < end})
+            block_size.observe(len(block), time.perf_counter() - started)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.file_size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as file:
+            if self.ranges is None:
+                await self._send_segment(send, file, zerocopy, 0, self.file_size, False)
+            elif self.boundary is None:
+                start, end = self.ranges[0]
+                await self._send_segment(send, file, zerocopy, start, end - start + 1, False)
+            else:
+                for start, end in self.ranges:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                    await self._send_segment(send, file, zerocopy, start, end - start + 1, True)
+                await send({"type": "http.response.body", "body": self._closing_boundary(), "more_body": False})
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+from utils.executors import io_pool, cpu_pool
+
+# Size of the bounce buffer used when the kernel cannot splice the data for us.
+COPY_BUFFER_SIZE = 1024 * 1024
+# Largest single request handed to copy_file_range / sendfile.
+SPLICE_MAX_BYTES = 1024 * 1024 * 1024
+# Bytes buffered from an incoming request body before they are written out.
+INGEST_BLOCK_SIZE = 1024 * 1024
+
+
+def _copy_buffered(src_fd: int, dst_fd: int, count: int) -> int:
+    copied = 0
+    while copied < count:
+        data = os.read(src_fd, min(COPY_BUFFER_SIZE, count - copied))
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        copied += len(data)
+    return copied
+
+
+def splice_file(src_fd: int, dst_fd: int, count: int) -> int:
+    """
+        Copy `count` bytes from the current offset of src_fd to the current offset of dst_fd.
+        Tries copy_file_range (data never leaves the kernel, and can be a reflink on
+        btrfs/xfs), then sendfile, then falls back to a bounded-buffer copy.
+        Returns the number of bytes copied.
+    """
+    copied = 0
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, dst_fd, min(SPLICE_MAX_BYTES, count - copied))
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError:
+            # EXDEV / EINVAL / ENOSYS: filesystem or kernel doesn't support it, try the next method.
+            pass
+
+    if hasattr(os, "sendfile"):
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, None, min(SPLICE_MAX_BYTES, count - copied))
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError:
+            pass
+
+    return copied + _copy_buffered(src_fd, dst_fd, count - copied)
+
+
+def chunk_part_path(directory: str, file_id: str, chunk_number: int) -> str:
+    return os.path.join(directory, f"{file_id}_chunk_{chunk_number}.part")
+
+
+def reassemble_chunks(directory: str, file_id: str, total_chunks: int) -> dict:
+    """
+        Splice every `{file_id}_chunk_{i}.part` in `directory` into `directory/file_id`
+        and remove the parts. Blocking: run it off the event loop.
+        Returns transfer stats (bytes, seconds, bytes_per_second).
+    """
+    final_path = os.path.join(directory, file_id)
+    started = time.perf_counter()
+    total_bytes = 0
+
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    dst_fd = os.open(final_path, flags, 0o644)
+    try:
+        for i in range(total_chunks):
+            chunk_path = chunk_part_path(directory, file_id, i)
+            src_fd = os.open(chunk_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                size = os.fstat(src_fd).st_size
+                copied = splice_file(src_fd, dst_fd, size)
+                if copied != size:
+                    raise IOError(f"Short copy of {chunk_path}: {copied} of {size} bytes")
+                total_bytes += copied
+            finally:
+                os.close(src_fd)
+    finally:
+        os.close(dst_fd)
+
+    for i in range(total_chunks):
+        os.remove(chunk_part_path(directory, file_id, i))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "bytes_per_second": total_bytes / elapsed if elapsed > 0 else 0,
+    }
+
+
+def upload_target_path(directory: str, file_id: str) -> str:
+    # Ends in .part so list-directory hides it until the upload is committed.
+    return os.path.join(directory, f"{file_id}.upload.part")
+
+
+def open_upload_target(target_path: str, total_size: int) -> int:
+    """
+        Open (creating if needed) the preallocated upload target and make sure it spans
+        total_size bytes. Safe to call concurrently from several chunk requests: the file
+        is never truncated and preallocation is idempotent.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    fd = os.open(target_path, flags, 0o644)
+    try:
+        if os.fstat(fd).st_size < total_size:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, total_size)
+                except OSError:
+                    # Filesystem without fallocate support (e.g. some network mounts).
+                    os.ftruncate(fd, total_size)
+            else:
+                os.ftruncate(fd, total_size)
+    except Exception:
+        os.close(fd)
+        raise
+    return fd
+
+
+def write_at(fd: int, data, offset: int) -> int:
+    """Write all of `data` at `offset` without touching the shared file position."""
+    view = memoryview(data)
+    written = 0
+    while written < len(view):
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(fd, view[written:], offset + written)
+        else:
+            os.lseek(fd, offset + written, os.SEEK_SET)
+            n = os.write(fd, view[written:])
+        written += n
+    return written
+
+
+def write_chunk_at(target_path: str, total_size: int, offset: int, data) -> int:
+    fd = open_upload_target(target_path, total_size)
+    try:
+        return write_at(fd, data, offset)
+    finally:
+        os.close(fd)
+
+
+def commit_upload_target(target_path: str, final_path: str, total_size: int) -> None:
+    """Trim to the exact size, flush to disk and atomically move into place."""
+    fd = os.open(target_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+    try:
+        os.ftruncate(fd, total_size)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(target_path, final_path)
+
+
+def open_chunk_part(chunk_path: str) -> int:
+    return os.open(chunk_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+
+
+async def iter_upload_file(upload, block_size: int = INGEST_BLOCK_SIZE):
+    """Read an UploadFile in bounded slices instead of all at once."""
+    while True:
+        data = await upload.read(block_size)
+        if not data:
+            break
+        yield data
+
+
+async def _write_block(fd: int, data, offset: int, hasher) -> int:
+    if hasher is None:
+        return await io_pool.run(write_at, fd, data, offset)
+    # The write and the hash read the same block, so they run side by side.
+    written, _ = await asyncio.gather(io_pool.run(write_at, fd, data, offset), cpu_pool.run(hasher.update, data))
+    return written
+
+
+async def ingest_stream(chunks, fd: int, offset: int = 0, max_bytes: int = None, hasher=None) -> int:
+    """
+        Write an async iterable of byte strings to fd starting at offset, keeping at most
+        about INGEST_BLOCK_SIZE bytes in memory no matter how large the body is.
+        If a hasher is given it is updated with every byte on the way through, on
+        cpu_pool while io_pool writes the same block, so the event loop never hashes.
+        Raises ValueError as soon as more than max_bytes arrive.
+        Returns the number of bytes written.
+    """
+    written = 0
+    buffer = bytearray()
+    async for piece in chunks:
+        if not piece:
+            continue
+        if max_bytes is not None and written + len(buffer) + len(piece) > max_bytes:
+            raise ValueError(f"Body is larger than the expected {max_bytes} bytes")
+        buffer += piece
+        if len(buffer) >= INGEST_BLOCK_SIZE:
+            await _write_block(fd, buffer, offset + written, hasher)
+            written += len(buffer)
+            buffer = bytearray()
+    if buffer:
+        await _write_block(fd, buffer, offset + written, hasher)
+        written += len(buffer)
+    return written
@@ -0,0 +1,275 @@
+import asyncio
+import errno
+import os
+import time
+import uuid
+from typing import Optional
+from utils.executors import io_pool
+from config import Config
+from utils.utils import get_db_connection, add_activity
+from utils.cache import invalidate_path
+from utils.deletions import remove_tree, trash_root
+from utils.dir_sizes import (
+    adjust_directory_size,
+    forget_directory_tree,
+    get_indexed_directory_size,
+    reconcile_directory_sizes,
+)
+from utils.permissions import move_file_rows, delete_file_rows, purge_file_rows, bump_permissions_version
+
+
+def get_trash_entry(entry_id: int) -> Optional[dict]:
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT * FROM trash WHERE id = ?", (entry_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def list_trash(user_id: Optional[int] = None) -> list:
+    """Entries that can still be restored, newest first; only user_id's own deletes if given."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        query = "SELECT * FROM trash WHERE status = 'trashed' AND purge_after > ?"
+        params = (time.time(),)
+        if user_id is not None:
+            query += " AND deleted_by = ?"
+            params += (user_id,)
+        cursor.execute(query + " ORDER BY id DESC", params)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def trash_stats() -> dict:
+    connection = get_db_connection()
+    try:
+        row = connection.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM trash"
+        ).fetchone()
+        return {"entries": row["entries"], "bytes": row["bytes"]}
+    finally:
+        connection.close()
+
+
+def _set_status(entry_id: int, status: str, expected: str) -> bool:
+    """Compare-and-set, so the reaper and a restore never both act on an entry."""
+    connection = get_db_connection()
+    try:
+        cursor = connection.execute(
+            "UPDATE trash SET status = ? WHERE id = ? AND status = ?", (status, entry_id, expected)
+        )
+        connection.commit()
+        return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+def _delete_in_place(file_path: str, is_folder: bool, size: int, user_id: int):
+    """Delete for good, rows included, for items that can't be renamed into the trash."""
+    remove_tree(file_path, size)
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        delete_file_rows(cursor, file_path)
+        if is_folder:
+            forget_directory_tree(file_path, cursor)
+        adjust_directory_size(os.path.dirname(file_path), -size, cursor)
+        add_activity(
+            cursor=cursor,
+            activity_type="File Management",
+            details=f"Deleted file: {file_path}",
+            category="File Management",
+            user_id=user_id,
+            changed_by=user_id
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+    bump_permissions_version()
+    invalidate_path(file_path, recursive=True)
+
+
+def move_to_trash(file_path: str, user_id: int) -> Optional[dict]:
+    """
+        Delete a file or folder by renaming it into the share's .trash folder: one rename
+        whatever the size of the tree. Its rows follow with one prefix UPDATE and the size
+        index forgets it. The reaper frees the space and the rows once
+        Config.TRASH_RETENTION has passed; until then restore_from_trash() undoes it.
+        Items on another volume mounted inside the share can't be renamed there; they
+        are deleted straight away and None is returned. Raises OSError on failure.
+    """
+    is_folder = os.path.isdir(file_path) and not os.path.islink(file_path)
+    size = get_indexed_directory_size(file_path) if is_folder else os.lstat(file_path).st_size
+    root = trash_root()
+    os.makedirs(root, exist_ok=True)
+    trash_path = os.path.join(root, f"{uuid.uuid4().hex}-{os.path.basename(file_path)}")
+    try:
+        os.rename(file_path, trash_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        _delete_in_place(file_path, is_folder, size, user_id)
+        return None
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        move_file_rows(cursor, file_path, trash_path)
+        if is_folder:
+            forget_directory_tree(file_path, cursor)
+        adjust_directory_size(os.path.dirname(file_path), -size, cursor)
+        cursor.execute(
+            """
+            INSERT INTO trash (original_path, trash_path, is_folder, size, deleted_by, purge_after)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (file_path, trash_path, is_folder, size, user_id, time.time() + Config.TRASH_RETENTION),
+        )
+        entry_id = cursor.lastrowid
+        add_activity(
+            cursor=cursor,
+            activity_type="File Management",
+            details=f"Deleted file: {file_path}",
+            category="File Management",
+            user_id=user_id,
+            changed_by=user_id
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        os.rename(trash_path, file_path)
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    bump_permissions_version()
+    invalidate_path(file_path, recursive=True)
+    return get_trash_entry(entry_id)
+
+
+def restore_from_trash(entry: dict, user_id: int) -> str:
+    """
+        Move a trashed item back to where it was deleted from, with its permissions.
+        Raises FileExistsError if something new is at that path now, FileNotFoundError if
+        its folder is gone, and LookupError if the entry is past its retention or being
+        purged. Returns the path.
+    """
+    if entry["purge_after"] <= time.time() or not _set_status(entry["id"], "restoring", "trashed"):
+        raise LookupError("Item is no longer in the trash")
+    original_path, trash_path = entry["original_path"], entry["trash_path"]
+    try:
+        if os.path.lexists(original_path):
+            raise FileExistsError(original_path)
+        os.rename(trash_path, original_path)
+    except OSError:
+        _set_status(entry["id"], "trashed", "restoring")
+        raise
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        move_file_rows(cursor, trash_path, original_path)
+        adjust_directory_size(os.path.dirname(original_path), entry["size"], cursor)
+        cursor.execute("DELETE FROM trash WHERE id = ?", (entry["id"],))
+        add_activity(
+            cursor=cursor,
+            activity_type="File Management",
+            details=f"Restored file: {original_path}",
+            category="File Management",
+            user_id=user_id,
+            changed_by=user_id
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        os.rename(original_path, trash_path)
+        _set_status(entry["id"], "trashed", "restoring")
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    if entry["is_folder"]:
+        reconcile_directory_sizes(original_path)
+    bump_permissions_version()
+    invalidate_path(original_path, recursive=True)
+    return original_path
+
+
+def reap_trash() -> int:
+    """
+        Purge every entry past its retention: the files at Config.TRASH_REAP_IOPS, then
+        the database rows in batches of Config.TRASH_PURGE_BATCH. Rows go only once the
+        files are gone, so an entry never loses its rows while it can be restored. One
+        that can't be fully removed is marked purge_failed and retried on the next run.
+        Returns the number of entries purged.
+    """
+    connection = get_db_connection()
+    try:
+        rows = connection.execute(
+            """
+            SELECT * FROM trash
+            WHERE status IN ('trashed', 'purge_failed') AND purge_after <= ?
+            ORDER BY purge_after
+            """,
+            (time.time(),),
+        ).fetchall()
+    finally:
+        connection.close()
+
+    purged = 0
+    for entry in map(dict, rows):
+        if not _set_status(entry["id"], "purging", entry["status"]):
+            continue
+        try:
+            if os.path.lexists(entry["trash_path"]):
+                remove_tree(entry["trash_path"], entry["size"], Config.TRASH_REAP_IOPS or None)
+            purge_file_rows(entry["trash_path"], Config.TRASH_PURGE_BATCH)
+        except Exception as e:
+            print(f"Error purging {entry['trash_path']} from the trash: {e}")
+            _set_status(entry["id"], "purge_failed", "purging")
+            continue
+        connection = get_db_connection()
+        try:
+            connection.execute("DELETE FROM trash WHERE id = ?", (entry["id"],))
+            connection.commit()
+        finally:
+            connection.close()
+        purged += 1
+    return purged
+
+
+def release_trash_entries():
+    """
+        Hand back entries a previous process was purging or restoring when it stopped. An
+        interrupted purge may have removed some files, so it is only purged again.
+    """
+    connection = get_db_connection()
+    try:
+        connection.execute("UPDATE trash SET status = 'purge_failed' WHERE status = 'purging'")
+        connection.execute("UPDATE trash SET status = 'trashed' WHERE status = 'restoring'")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+async def trash_reaper(interval: int):
+    """Background task: purge expired trash every `interval` seconds."""
+    await io_pool.run(release_trash_entries)
+    while True:
+        try:
+            count = await io_pool.run(reap_trash)
+            if count:
+                print(f"Trash reaper purged {count} items")
+        except Exception as e:
+            print(f"Error reaping trash: {e}")
+        await asyncio.sleep(interval)
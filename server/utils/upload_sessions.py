@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import math
+import os
+import secrets
+import time
+from typing import Optional
+from config import Config
+from utils.executors import io_pool
+from utils.utils import get_db_connection
+from utils.transfer import upload_target_path
+from utils.checksums import DEFAULT_ALGORITHM
+
+
+def _new_bitmap(total_chunks: int) -> bytes:
+    return bytes((total_chunks + 7) // 8)
+
+
+def _is_set(bitmap: bytes, chunk_number: int) -> bool:
+    return bool(bitmap[chunk_number >> 3] & (1 << (chunk_number & 7)))
+
+
+def missing_chunks(session: dict) -> list:
+    bitmap = session["received"]
+    return [i for i in range(session["total_chunks"]) if not _is_set(bitmap, i)]
+
+
+def expected_chunk_length(session: dict, chunk_number: int) -> int:
+    if chunk_number == session["total_chunks"] - 1:
+        return session["total_size"] - chunk_number * session["chunk_size"]
+    return session["chunk_size"]
+
+
+def session_target_path(session: dict) -> str:
+    return upload_target_path(session["directory"], f"{session['file_name']}.{session['id']}")
+
+
+def session_final_path(session: dict) -> str:
+    return os.path.join(session["directory"], session["file_name"])
+
+
+def create_session(
+    user_id: int,
+    directory: str,
+    file_name: str,
+    total_size: int,
+    chunk_size: int,
+    checksum_algorithm: str = DEFAULT_ALGORITHM,
+    session_id: str = None,
+) -> dict:
+    """New session, or with a session_id that already exists, that session unchanged."""
+    session_id = session_id or secrets.token_hex(16)
+    # An empty file is still one (empty) chunk so it can be committed like any other.
+    total_chunks = max(1, math.ceil(total_size / chunk_size))
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO upload_sessions (
+                id, user_id, directory, file_name, total_size, chunk_size, total_chunks, received,
+                checksum_algorithm, expires_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (session_id, user_id, directory, file_name, total_size, chunk_size,
+             total_chunks, _new_bitmap(total_chunks), checksum_algorithm,
+             time.time() + Config.UPLOAD_SESSION_TTL),
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+    return get_session(session_id)
+
+
+def chunk_upload_session_id(user_id: int, directory: str, file_id: str, total_size: int, chunk_size: int) -> str:
+    """
+        Session id for a preallocated /upload-chunk upload. Those requests carry no
+        session id, so every chunk of one upload derives the same one from its metadata.
+    """
+    key = f"{user_id}\0{directory}\0{file_id}\0{total_size}\0{chunk_size}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def get_session(session_id: str) -> Optional[dict]:
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def mark_chunk_received(session_id: str, chunk_number: int, checksum: str) -> Optional[dict]:
+    """
+        Set the chunk's bit in the manifest, record its checksum and push back the
+        session's expiry. Returns the updated session, or None if it is gone.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        # IMMEDIATE takes the write lock up front so parallel chunk requests
+        # serialize on the read-modify-write instead of losing each other's bits.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,))
+        row = cursor.fetchone()
+        if row is None:
+            connection.rollback()
+            return None
+
+        bitmap = bytearray(row["received"])
+        bitmap[chunk_number >> 3] |= 1 << (chunk_number & 7)
+        cursor.execute(
+            """
+            UPDATE upload_sessions
+            SET received = ?, updated_at = CURRENT_TIMESTAMP, expires_at = ?
+            WHERE id = ?
+            """,
+            (bytes(bitmap), time.time() + Config.UPLOAD_SESSION_TTL, session_id),
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO upload_chunks (session_id, chunk_number, checksum) VALUES (?, ?, ?)",
+            (session_id, chunk_number, checksum),
+        )
+        connection.commit()
+
+        session = dict(row)
+        session["received"] = bytes(bitmap)
+        return session
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def get_chunk_checksums(session_id: str) -> dict:
+    """Checksums of the received chunks, keyed by chunk number."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT chunk_number, checksum FROM upload_chunks WHERE session_id = ? ORDER BY chunk_number",
+            (session_id,),
+        )
+        return {row["chunk_number"]: row["checksum"] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def delete_session(session_id: str) -> bool:
+    """False if it was already gone, so of two callers only one sees True."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session_id,))
+        cursor.execute("DELETE FROM upload_sessions WHERE id = ?", (session_id,))
+        connection.commit()
+        return cursor.rowcount == 1
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def reap_upload_sessions() -> int:
+    """
+        Drop every session past its expires_at along with its partial file.
+        Returns the number of sessions removed.
+    """
+    now = time.time()
+    connection = get_db_connection()
+    try:
+        rows = connection.execute("SELECT * FROM upload_sessions WHERE expires_at <= ?", (now,)).fetchall()
+    finally:
+        connection.close()
+
+    reaped = 0
+    for session in map(dict, rows):
+        connection = get_db_connection()
+        try:
+            # Skip a session that received a chunk since the SELECT.
+            cursor = connection.execute(
+                "DELETE FROM upload_sessions WHERE id = ? AND expires_at <= ?", (session["id"], now)
+            )
+            if cursor.rowcount == 0:
+                connection.rollback()
+                continue
+            connection.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session["id"],))
+            connection.commit()
+        finally:
+            connection.close()
+        try:
+            os.remove(session_target_path(session))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing expired upload {session_target_path(session)}: {e}")
+        reaped += 1
+    return reaped
+
+
+async def upload_session_reaper(interval: int):
+    """Background task: drop expired upload sessions every `interval` seconds."""
+    while True:
+        try:
+            count = await io_pool.run(reap_upload_sessions)
+            if count:
+                print(f"Upload session reaper removed {count} expired sessions")
+        except Exception as e:
+            print(f"Error reaping upload sessions: {e}")
+        await asyncio.sleep(interval)
+
+
+def session_status(session: dict) -> dict:
+    missing = missing_chunks(session)
+    return {
+        "session_id": session["id"],
+        "file_name": session["file_name"],
+        "total_size": session["total_size"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "checksum_algorithm": session["checksum_algorithm"],
+        "received_chunks": session["total_chunks"] - len(missing),
+        "missing_chunks": missing,
+        "expires_at": session["expires_at"],
+    }
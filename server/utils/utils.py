@@ -1,4 +1,7 @@
+import os
+import queue
 import sqlite3
+import threading
 from datetime import datetime
 import bcrypt
 from typing import Optional
@@ -9,12 +12,159 @@ from user_agents import parse
 
 DATABASE_FILE = "my_database.db"
 
-def get_db_connection():
-    """Create a new database connection."""
-    connection = sqlite3.connect(DATABASE_FILE)
+# One bit per permission. A group's permission_mask holds the bits its permission
+# implies (Full Control includes everything, Modify includes Read, Write, ...), so an
+# access check is `mask & ACTION_BITS[action]`.
+PERMISSION_READ = 1
+PERMISSION_WRITE = 2
+PERMISSION_EXECUTE = 4
+PERMISSION_DELETE = 8
+PERMISSION_MODIFY = 16
+PERMISSION_FULL_CONTROL = 32
+
+ACTION_BITS = {
+    "Read": PERMISSION_READ,
+    "Write": PERMISSION_WRITE,
+    "Read & Execute": PERMISSION_EXECUTE,
+    "Delete": PERMISSION_DELETE,
+    "Modify": PERMISSION_MODIFY,
+    "Full Control": PERMISSION_FULL_CONTROL,
+}
+
+PERMISSION_MASKS = {
+    "Full Control": PERMISSION_FULL_CONTROL | PERMISSION_MODIFY | PERMISSION_EXECUTE
+                    | PERMISSION_READ | PERMISSION_WRITE | PERMISSION_DELETE,
+    "Modify": PERMISSION_MODIFY | PERMISSION_EXECUTE | PERMISSION_READ | PERMISSION_WRITE | PERMISSION_DELETE,
+    "Read & Execute": PERMISSION_EXECUTE | PERMISSION_READ,
+    "Read": PERMISSION_READ,
+    "Write": PERMISSION_WRITE,
+    "Delete": PERMISSION_DELETE,
+}
+
+
+def permission_mask(permission: str) -> int:
+    return PERMISSION_MASKS.get(permission, 0)
+
+
+class _BitOr:
+    """BIT_OR(x) aggregate; SQLite has the | operator but no aggregate for it."""
+
+    def __init__(self):
+        self.value = 0
+
+    def step(self, value):
+        if value is not None:
+            self.value |= value
+
+    def finalize(self):
+        return self.value
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+        A connection from get_db_connection(). close() rolls back whatever the caller left
+        uncommitted and hands the connection back to the pool instead of closing it, so
+        callers keep the usual open / try / finally close() pattern.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.database_file = args[0] if args else kwargs.get("database")
+        self.checked_out = True
+
+    def close(self):
+        # Several callers close twice (cursor.close() helpers, finally blocks).
+        if not self.checked_out:
+            return
+        self.checked_out = False
+        try:
+            if self.in_transaction:
+                self.rollback()
+        except sqlite3.Error:
+            super().close()
+            return
+        pool = _connection_pools.get(self.database_file)
+        if pool is None:
+            super().close()
+            return
+        try:
+            pool.put_nowait(self)
+        except queue.Full:
+            super().close()
+
+    def close_for_good(self):
+        self.checked_out = False
+        super().close()
+
+
+# Idle connections per database file, most recently used first.
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+def _open_connection(database_file: str) -> PooledConnection:
+    connection = sqlite3.connect(
+        database_file,
+        factory=PooledConnection,
+        # Sets SQLite's busy timeout: wait this long for a lock instead of failing at once.
+        timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        # Pooled connections are handed from thread to thread, one user at a time.
+        check_same_thread=False,
+    )
     connection.row_factory = sqlite3.Row
+    connection.create_aggregate("BIT_OR", 1, _BitOr)
+    # WAL lets readers run alongside the single writer instead of queueing behind it;
+    # with WAL, synchronous=NORMAL only risks the last commits on power loss, never corruption.
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+    connection.execute(f"PRAGMA cache_size={-int(Config.SQLITE_CACHE_SIZE_KB)}")
     return connection
 
+
+def get_db_connection():
+    """A pooled database connection; close() returns it to the pool (0 pool size: closes it)."""
+    database_file = DATABASE_FILE
+    if Config.DB_CONNECTION_POOL_SIZE <= 0:
+        return _open_connection(database_file)
+    with _connection_pools_lock:
+        pool = _connection_pools.get(database_file)
+        if pool is None:
+            pool = _connection_pools[database_file] = queue.LifoQueue(maxsize=Config.DB_CONNECTION_POOL_SIZE)
+    try:
+        connection = pool.get_nowait()
+    except queue.Empty:
+        return _open_connection(database_file)
+    connection.checked_out = True
+    return connection
+
+
+def close_db_connections():
+    """Really close every idle pooled connection (shutdown, or before replacing the file)."""
+    with _connection_pools_lock:
+        pools = list(_connection_pools.values())
+        _connection_pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close_for_good()
+            except queue.Empty:
+                break
+
+def subtree_bounds(path: str):
+    """
+        (low, high) such that `col > low AND col < high` selects every path strictly below
+        `path`. Unlike LIKE 'path/%' this is a range scan on the column's index.
+    """
+    prefix = path.rstrip("/\\") + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+def ensure_column(cursor, table: str, column: str, definition: str):
+    """Add a column to an existing table if it is missing."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row["name"] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 def initialize_database():
     """Initialize the database with the required tables."""
     connection = get_db_connection()
@@ -100,6 +250,9 @@ def initialize_database():
             owner_id INTEGER NOT NULL,
             parent_id INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            checksum VARCHAR(128),
+            checksum_algorithm VARCHAR(32),
+            checksum_chunk_size INTEGER,
             FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE,
             FOREIGN KEY (parent_id) REFERENCES files(id) ON DELETE CASCADE
 
@@ -117,6 +270,7 @@ def initialize_database():
             permission VARCHAR(50) NOT NULL CHECK (permission IN (
                 'Full Control', 'Modify', 'Read & Execute', 'Read', 'Write','Delete'
             )),
+            permission_mask INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (group_id) REFERENCES groups(id) ON DELETE CASCADE
         );
         """
@@ -135,6 +289,116 @@ def initialize_database():
         """
     )
 
+    # Resumable upload sessions; `received` is a bitmap with one bit per chunk.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            id VARCHAR(64) PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            directory VARCHAR(1024) NOT NULL,
+            file_name VARCHAR(255) NOT NULL,
+            total_size INTEGER NOT NULL,
+            chunk_size INTEGER NOT NULL,
+            total_chunks INTEGER NOT NULL,
+            received BLOB NOT NULL,
+            checksum_algorithm VARCHAR(32) NOT NULL DEFAULT 'sha256',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_chunks (
+            session_id VARCHAR(64) NOT NULL,
+            chunk_number INTEGER NOT NULL,
+            checksum VARCHAR(128) NOT NULL,
+            PRIMARY KEY (session_id, chunk_number),
+            FOREIGN KEY (session_id) REFERENCES upload_sessions(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    # Closure table of the files hierarchy: one row per (ancestor, descendant) pair,
+    # including (id, id, 0). Subtree queries are a range scan on the primary key,
+    # ancestor queries use idx_file_ancestors_descendant.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS file_ancestors (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id),
+            FOREIGN KEY (ancestor_id) REFERENCES files(id) ON DELETE CASCADE,
+            FOREIGN KEY (descendant_id) REFERENCES files(id) ON DELETE CASCADE
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_file_ancestors_descendant
+        ON file_ancestors (descendant_id, ancestor_id);
+        """
+    )
+
+    # Cached recursive size of every folder, kept current by uploads, deletes and moves.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS directory_sizes (
+            path VARCHAR(1024) PRIMARY KEY,
+            size INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+
+    # Deleted files and folders waiting in the share's .trash folder (utils/trash.py).
+    # status is 'trashed', or 'purging'/'restoring' while the reaper or a restore owns it.
+    # 'purge_failed' entries may be partly deleted: they can't be restored, only purged again.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS trash (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            original_path VARCHAR(1024) NOT NULL,
+            trash_path VARCHAR(1024) NOT NULL UNIQUE,
+            is_folder BOOLEAN NOT NULL,
+            size INTEGER NOT NULL DEFAULT 0,
+            deleted_by INTEGER,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            purge_after REAL NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'trashed',
+            FOREIGN KEY (deleted_by) REFERENCES users(id) ON DELETE SET NULL
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_trash_purge_after ON trash (status, purge_after);
+        """
+    )
+
+    # Columns added after the first release; CREATE TABLE IF NOT EXISTS won't add them to old databases.
+    ensure_column(cursor, "files", "checksum", "VARCHAR(128)")
+    ensure_column(cursor, "files", "checksum_algorithm", "VARCHAR(32)")
+    ensure_column(cursor, "files", "checksum_chunk_size", "INTEGER")
+    ensure_column(cursor, "upload_sessions", "checksum_algorithm", "VARCHAR(32) NOT NULL DEFAULT 'sha256'")
+    ensure_column(cursor, "upload_sessions", "expires_at", "REAL NOT NULL DEFAULT 0")
+    # Sessions from before expires_at existed get a full TTL from their last chunk.
+    cursor.execute(
+        "UPDATE upload_sessions SET expires_at = CAST(strftime('%s', updated_at) AS REAL) + ? WHERE expires_at = 0",
+        (Config.UPLOAD_SESSION_TTL,),
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_sessions_expires_at ON upload_sessions (expires_at)")
+    ensure_column(cursor, "group_permissions", "permission_mask", "INTEGER NOT NULL DEFAULT 0")
+    # Backfill (and repair) masks from the permission strings.
+    cursor.executemany(
+        "UPDATE group_permissions SET permission_mask = ? WHERE permission = ? AND permission_mask != ?",
+        [(mask, permission, mask) for permission, mask in PERMISSION_MASKS.items()],
+    )
+
     connection.commit()
     cursor.close()
     connection.close()
@@ -187,8 +451,8 @@ def add_default_data():
             (3, 'Read')           # Guests group
         ]
         cursor.executemany(
-            "INSERT INTO group_permissions (group_id, permission) VALUES (?, ?)",
-            group_permissions
+            "INSERT INTO group_permissions (group_id, permission, permission_mask) VALUES (?, ?, ?)",
+            [(group_id, permission, permission_mask(permission)) for group_id, permission in group_permissions]
         )
 
    